@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Favorite, Watchlist
+from .models import Favorite, Person, SuggestionSnapshot, TasteProfile, Title, Watchlist
 
 admin.site.register(Favorite)
 admin.site.register(Watchlist)
+admin.site.register(TasteProfile)
+admin.site.register(Title)
+admin.site.register(SuggestionSnapshot)
+admin.site.register(Person)
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class MoviesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'movies'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .metrics import install_db_timer
+
+        connection_created.connect(install_db_timer)
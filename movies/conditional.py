@@ -0,0 +1,63 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import quote_etag
+
+
+def is_public(request, user):
+    """True when a page is the same for every logged-out visitor."""
+    return not user.is_authenticated and CookieStorage.cookie_name not in (
+        request.COOKIES
+    )
+
+
+def fingerprint(*payloads):
+    """Hash of the data a page or fragment is rendered from."""
+    body = json.dumps(
+        [settings.ANON_PAGE_VERSION, *payloads], sort_keys=True, default=str
+    )
+    return hashlib.sha1(body.encode()).hexdigest()
+
+
+def etag_for(*payloads):
+    """ETag for a page built from ``payloads``.
+
+    It hashes the upstream data the page is rendered from, so it only
+    changes when that data (or ``settings.ANON_PAGE_VERSION``) does, and
+    every worker computes the same one. There is no Last-Modified: TMDB
+    doesn't say when its data changed.
+    """
+    return quote_etag(fingerprint(*payloads))
+
+
+def make_public(response, etag):
+    response.headers["ETag"] = etag
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=settings.ANON_PAGE_MAX_AGE,
+        stale_while_revalidate=settings.ANON_PAGE_STALE,
+    )
+    patch_vary_headers(response, ("Cookie",))
+    return response
+
+
+def make_private(response):
+    """Keep a per-user page (or one carrying messages) out of shared caches."""
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def not_modified(request, etag):
+    """Return a 304 (or 412) if the request's ETag still matches."""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        make_public(response, etag)
+    return response
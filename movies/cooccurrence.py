@@ -0,0 +1,145 @@
+import threading
+from collections import Counter, defaultdict
+from heapq import nlargest
+from math import sqrt
+from operator import itemgetter
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+from .models import Favorite
+from .refresh import Refresher
+
+
+class CooccurrenceIndex:
+    """Item-item index answering "users who favorited this also favorited".
+
+    The item-item co-occurrence matrix is built per worker from the
+    favorites table with one sparse product (``B.T @ B`` over the binary
+    user x title matrix) and rebuilt in the background every
+    ``settings.COOCCURRENCE_REFRESH`` seconds. Favorites added or removed in this worker in between are
+    applied as an incremental delta. Neighbors are scored by cosine
+    similarity of the titles' fan sets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh = Refresher(self.build, lambda: settings.COOCCURRENCE_REFRESH)
+        self._matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._index = {}
+        self._keys = []
+        self._counts = np.zeros(0, dtype=np.float32)
+        self._meta = {}
+        self._delta = defaultdict(Counter)
+        self._count_delta = Counter()
+
+    def build(self):
+        users, index, meta = {}, {}, {}
+        rows, cols = [], []
+        favorites = Favorite.objects.order_by("added_at").values_list(
+            "user_id", "media_type", "tmdb_id", "title", "poster_url"
+        )
+        for user_id, media_type, tmdb_id, title, poster in favorites.iterator():
+            key = (media_type, tmdb_id)
+            rows.append(users.setdefault(user_id, len(users)))
+            cols.append(index.setdefault(key, len(index)))
+            meta[key] = (title, poster)
+
+        fans = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(users), len(index)),
+        )
+        matrix = (fans.T @ fans).tocsr()
+        counts = matrix.diagonal()
+        matrix.setdiag(0)
+        matrix.eliminate_zeros()
+
+        with self._lock:
+            self._matrix = matrix
+            self._index = index
+            self._keys = list(index)
+            self._counts = counts
+            self._meta = meta
+            self._delta = defaultdict(Counter)
+            self._count_delta = Counter()
+
+    def record(self, user_keys, key, sign=1, meta=None):
+        """Apply one favorite added (``sign=1``) or removed (``sign=-1``).
+
+        ``user_keys`` are the user's other favorites at the time of the change.
+        """
+        if not self._refresh.built:
+            return
+        with self._lock:
+            for other in user_keys:
+                if other == key:
+                    continue
+                self._delta[key][other] += sign
+                self._delta[other][key] += sign
+            self._count_delta[key] += sign
+            if meta and key not in self._meta:
+                self._meta[key] = meta
+
+    def _count(self, key):
+        i = self._index.get(key)
+        base = self._counts[i] if i is not None else 0
+        return base + self._count_delta[key]
+
+    def _scores(self, key):
+        counts = Counter()
+        i = self._index.get(key)
+        if i is not None:
+            start, end = self._matrix.indptr[i], self._matrix.indptr[i + 1]
+            for j, n in zip(
+                self._matrix.indices[start:end], self._matrix.data[start:end]
+            ):
+                counts[self._keys[j]] += n
+        for other, n in self._delta.get(key, {}).items():
+            counts[other] += n
+
+        fans = self._count(key)
+        scores = {}
+        for other, n in counts.items():
+            other_fans = self._count(other)
+            if n > 0 and fans > 0 and other_fans > 0:
+                scores[other] = n / sqrt(fans * other_fans)
+        return scores
+
+    def _items(self, ranked):
+        items = []
+        for (media_type, tmdb_id), _ in ranked:
+            title, poster = self._meta.get((media_type, tmdb_id), (None, None))
+            if not title:
+                continue
+            items.append(
+                {
+                    "id": tmdb_id,
+                    "title": title,
+                    "poster": poster,
+                    "media_type": media_type,
+                }
+            )
+        return items
+
+    def neighbors(self, key, n=8):
+        """Titles most often favorited together with ``key``."""
+        self._refresh.ensure()
+        with self._lock:
+            ranked = nlargest(n, self._scores(key).items(), key=itemgetter(1))
+            return self._items(ranked)
+
+    def recommend(self, favorite_keys, n=20):
+        """Sum neighbor scores over a user's favorites, excluding them."""
+        self._refresh.ensure()
+        favorite_keys = set(favorite_keys)
+        with self._lock:
+            totals = Counter()
+            for key in favorite_keys:
+                for other, score in self._scores(key).items():
+                    if other not in favorite_keys:
+                        totals[other] += score
+            return self._items(totals.most_common(n))
+
+
+cooccurrence_index = CooccurrenceIndex()
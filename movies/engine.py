@@ -0,0 +1,139 @@
+import threading
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+from .models import Title
+from .refresh import Refresher
+from .tmdb import IMAGE_BASE
+
+# Relative weight of each feature family before IDF scaling.
+FEATURE_WEIGHTS = {"genre": 1.0, "keyword": 1.5, "person": 1.0}
+
+
+class ContentEngine:
+    """Content-based recommender over every Title the app has stored.
+
+    Each title is a sparse row of genre, keyword and cast/crew features,
+    IDF-weighted and L2-normalized. A user is the sum of their favorites'
+    rows, and candidates are ranked by cosine similarity with one sparse
+    matrix-vector product. The matrix is rebuilt per worker, in the
+    background, every ``settings.RECOMMENDER_REFRESH`` seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh = Refresher(self.build, lambda: settings.RECOMMENDER_REFRESH)
+        self._state = self._empty_state()
+
+    @staticmethod
+    def _empty_state():
+        return {
+            "matrix": sparse.csr_matrix((0, 0), dtype=np.float32),
+            "index": {},
+            "keys": [],
+            "meta": [],
+            "has_poster": np.zeros(0, dtype=bool),
+        }
+
+    def build(self):
+        vocab = {}
+        data, indices, indptr = [], [], [0]
+        keys, meta = [], []
+
+        rows = Title.objects.values_list(
+            "tmdb_id",
+            "media_type",
+            "title",
+            "poster_path",
+            "genres",
+            "keywords",
+            "people",
+        )
+        for row in rows.iterator():
+            tmdb_id, media_type, title, poster, genres, keywords, people = row
+            features = {}
+            for gid in genres:
+                features[f"g{gid}"] = FEATURE_WEIGHTS["genre"]
+            for kid in keywords:
+                features[f"k{kid}"] = FEATURE_WEIGHTS["keyword"]
+            for pid, weight in people.items():
+                features[f"p{pid}"] = FEATURE_WEIGHTS["person"] * weight
+            for name, weight in features.items():
+                indices.append(vocab.setdefault(name, len(vocab)))
+                data.append(weight)
+            indptr.append(len(indices))
+            keys.append((media_type, tmdb_id))
+            meta.append((title, poster))
+
+        matrix = sparse.csr_matrix(
+            (
+                np.asarray(data, dtype=np.float32),
+                np.asarray(indices, dtype=np.int32),
+                np.asarray(indptr, dtype=np.int64),
+            ),
+            shape=(len(keys), len(vocab)),
+        )
+        if matrix.nnz:
+            doc_freq = np.bincount(matrix.indices, minlength=matrix.shape[1])
+            idf = np.log((1 + len(keys)) / (1 + doc_freq)) + 1
+            matrix = (matrix @ sparse.diags(idf.astype(np.float32))).tocsr()
+            norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+            norms[norms == 0] = 1
+            matrix = (sparse.diags(1 / norms) @ matrix).tocsr()
+
+        state = {
+            "matrix": matrix,
+            "index": {key: i for i, key in enumerate(keys)},
+            "keys": keys,
+            "meta": meta,
+            "has_poster": np.array([bool(poster) for _, poster in meta], dtype=bool),
+        }
+        with self._lock:
+            self._state = state
+
+    def recommend(self, favorite_keys, k=20):
+        """Return up to ``k`` suggestion dicts most similar to the favorites.
+
+        ``favorite_keys`` are ``(media_type, tmdb_id)`` pairs; favorites and
+        titles without a poster are never returned.
+        """
+        self._refresh.ensure()
+        state = self._state
+        rows = [state["index"][key] for key in favorite_keys if key in state["index"]]
+        if not rows or k <= 0:
+            return []
+
+        matrix = state["matrix"]
+        user = np.asarray(matrix[rows].sum(axis=0)).ravel()
+        norm = np.linalg.norm(user)
+        if not norm:
+            return []
+
+        scores = matrix @ (user / norm)
+        scores[rows] = 0
+        scores[~state["has_poster"]] = 0
+
+        k = min(k, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        suggestions = []
+        for i in top:
+            if scores[i] <= 0:
+                break
+            media_type, tmdb_id = state["keys"][i]
+            title, poster = state["meta"][i]
+            suggestions.append(
+                {
+                    "id": tmdb_id,
+                    "title": title,
+                    "poster": f"{IMAGE_BASE}{poster}",
+                    "media_type": media_type,
+                }
+            )
+        return suggestions
+
+
+content_engine = ContentEngine()
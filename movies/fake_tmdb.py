@@ -0,0 +1,231 @@
+"""A local stand-in for the TMDB API, used by the ``benchmark`` command.
+
+Payloads are generated deterministically from the request path, shaped
+like the real responses for every endpoint the app uses, and each
+request can be delayed to simulate upstream latency.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+GENRES = {
+    "movie": [(28, "Action"), (12, "Adventure"), (35, "Comedy"), (18, "Drama")],
+    "tv": [(10759, "Action & Adventure"), (35, "Comedy"), (18, "Drama")],
+}
+PAGE_SIZE = 20
+TOTAL_PAGES = 5
+
+
+def _rng(*seed):
+    return random.Random(":".join(str(s) for s in seed))
+
+
+def list_item(tmdb_id, media_type):
+    rng = _rng(media_type, tmdb_id)
+    item = {
+        "id": tmdb_id,
+        "media_type": media_type,
+        "poster_path": f"/poster{tmdb_id}.jpg",
+        "overview": "A stand-in overview for benchmarking.",
+        "popularity": round(rng.uniform(1, 500), 2),
+        "genre_ids": [gid for gid, _ in rng.sample(GENRES[media_type], 2)],
+    }
+    date = f"20{rng.randint(0, 24):02d}-{rng.randint(1, 12):02d}-01"
+    if media_type == "movie":
+        item.update(title=f"Movie {tmdb_id}", release_date=date)
+    else:
+        item.update(name=f"Show {tmdb_id}", first_air_date=date)
+    return item
+
+
+def results_page(seed, page, media_types=("movie", "tv")):
+    base = _rng(seed).randint(1, 50_000)
+    results = [
+        list_item(base + page * PAGE_SIZE + i, media_types[i % len(media_types)])
+        for i in range(PAGE_SIZE)
+    ]
+    return {
+        "page": page,
+        "total_pages": TOTAL_PAGES,
+        "total_results": TOTAL_PAGES * PAGE_SIZE,
+        "results": results,
+    }
+
+
+def person(person_id):
+    return {
+        "id": person_id,
+        "name": f"Person {person_id}",
+        "profile_path": f"/profile{person_id}.jpg",
+        "popularity": round(_rng("person", person_id).uniform(1, 100), 2),
+    }
+
+
+def details(media_type, tmdb_id, append):
+    rng = _rng("details", media_type, tmdb_id)
+    data = list_item(tmdb_id, media_type)
+    data.pop("media_type")
+    data["genres"] = [
+        {"id": gid, "name": name} for gid, name in rng.sample(GENRES[media_type], 2)
+    ]
+    if media_type == "movie":
+        data["runtime"] = rng.randint(80, 180)
+    else:
+        data["episode_run_time"] = [rng.randint(20, 60)]
+
+    parts = {
+        "credits": lambda: {
+            "cast": [
+                dict(person(rng.randint(1, 5000)), character=f"Role {i}")
+                for i in range(10)
+            ],
+            "crew": [dict(person(rng.randint(1, 5000)), job="Director")],
+        },
+        "keywords": lambda: {
+            "keywords" if media_type == "movie" else "results": [
+                {"id": rng.randint(1, 2000), "name": "keyword"} for _ in range(6)
+            ]
+        },
+        "similar": lambda: results_page(("similar", tmdb_id), 1, (media_type,)),
+        "recommendations": lambda: results_page(("recs", tmdb_id), 1, (media_type,)),
+        "videos": lambda: {
+            "results": [{"site": "YouTube", "key": f"v{tmdb_id}", "type": "Trailer"}]
+        },
+        "watch/providers": lambda: {
+            "results": {"US": {"flatrate": [{"provider_name": "Netflix"}]}}
+        },
+    }
+    for part in append:
+        if part in parts:
+            data[part] = parts[part]()
+    return data
+
+
+ROUTES = [
+    (
+        r"/genre/(movie|tv)/list",
+        lambda m, q: {
+            "genres": [{"id": gid, "name": name} for gid, name in GENRES[m[1]]]
+        },
+    ),
+    (r"/trending/movie/\w+", lambda m, q: results_page("trending", 1, ("movie",))),
+    (r"/tv/popular", lambda m, q: results_page("popular", 1, ("tv",))),
+    (r"/movie/upcoming", lambda m, q: results_page("upcoming", 1, ("movie",))),
+    (r"/tv/on_the_air", lambda m, q: results_page("on_air", 1, ("tv",))),
+    (
+        r"/search/multi",
+        lambda m, q: results_page(("search", q.get("query")), int(q.get("page", 1))),
+    ),
+    (
+        r"/search/person",
+        lambda m, q: {
+            "results": [
+                dict(person(_rng(q.get("query")).randint(1, 5000) + i))
+                for i in range(5)
+            ]
+        },
+    ),
+    (
+        r"/discover/(movie|tv)",
+        lambda m, q: results_page(
+            ("discover", m[1], q.get("with_genres")), int(q.get("page", 1)), (m[1],)
+        ),
+    ),
+    (
+        r"/person/(\d+)/combined_credits",
+        lambda m, q: {
+            "cast": [
+                list_item(int(m[1]) * 100 + i, ("movie", "tv")[i % 2])
+                for i in range(60)
+            ]
+        },
+    ),
+    (
+        r"/(movie|tv)/(\d+)/watch/providers",
+        lambda m, q: details(m[1], int(m[2]), ["watch/providers"])["watch/providers"],
+    ),
+    (
+        r"/(movie|tv)/(\d+)/recommendations",
+        lambda m, q: results_page(("recs", int(m[2])), int(q.get("page", 1)), (m[1],)),
+    ),
+    (
+        r"/(movie|tv)/(\d+)",
+        lambda m, q: details(
+            m[1], int(m[2]), q.get("append_to_response", "").split(",")
+        ),
+    ),
+]
+ROUTES = [(re.compile(rf"^{pattern}$"), handler) for pattern, handler in ROUTES]
+
+
+class FakeTMDB:
+    """Threaded HTTP server answering TMDB v3 paths on ``127.0.0.1``.
+
+    ``latency`` seconds are slept before every response. ``calls`` counts
+    requests per path so a benchmark can report upstream calls.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/3"
+
+    @property
+    def total_calls(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+    def respond(self, raw_path):
+        parsed = urlparse(raw_path)
+        path = parsed.path.removeprefix("/3")
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        with self._lock:
+            self.calls[path] += 1
+        for pattern, handler in ROUTES:
+            match = pattern.match(path)
+            if match:
+                return 200, handler(match, query)
+        return 404, {"status_message": "The resource you requested could not be found."}
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if fake.latency:
+                    time.sleep(fake.latency)
+                status, payload = fake.respond(self.path)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
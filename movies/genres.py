@@ -0,0 +1,105 @@
+import re
+import threading
+import unicodedata
+
+from django.conf import settings
+
+from .refresh import Refresher
+from .tmdb import get_client
+
+MEDIA_TYPES = ("movie", "tv")
+
+# Common spellings that don't match a TMDB genre name, mapped to names that
+# do (after normalization). TV merges some movie genres into combined ones.
+ALIASES = {
+    "sci fi": ["science fiction", "sci fi fantasy"],
+    "scifi": ["science fiction", "sci fi fantasy"],
+    "sf": ["science fiction", "sci fi fantasy"],
+    "fantasy": ["fantasy", "sci fi fantasy"],
+    "action": ["action", "action adventure"],
+    "adventure": ["adventure", "action adventure"],
+    "war": ["war", "war politics"],
+    "politics": ["war politics"],
+    "kids": ["family", "kids"],
+    "children": ["family", "kids"],
+    "animated": ["animation"],
+    "anime": ["animation"],
+    "cartoon": ["animation"],
+    "doc": ["documentary"],
+    "docs": ["documentary"],
+    "romcom": ["romance", "comedy"],
+    "scary": ["horror"],
+    "suspense": ["thriller", "mystery"],
+    "musical": ["music"],
+    "reality tv": ["reality"],
+}
+
+
+def normalize(name):
+    """Lowercase, strip accents and punctuation, and collapse whitespace."""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    name = name.lower().replace("&", " ")
+    name = re.sub(r"[^a-z0-9]+", " ", name)
+    return " ".join(word for word in name.split() if word != "and")
+
+
+class GenreIndex:
+    """In-process map of genre names to TMDB movie and TV genre ids.
+
+    Loaded on first use (or warmed at worker start-up) and reloaded in the
+    background once ``settings.TMDB_GENRE_INDEX_TTL`` seconds have passed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names = {}
+        self._refresh = Refresher(self.load, lambda: settings.TMDB_GENRE_INDEX_TTL)
+
+    def load(self):
+        tmdb = get_client()
+        names = {}
+        for media_type in MEDIA_TYPES:
+            data = tmdb.genre_list(media_type)
+            if not data:
+                continue
+            for g in data.get("genres", []):
+                entry = names.setdefault(normalize(g["name"]), {})
+                entry[media_type] = g["id"]
+
+        if names:
+            with self._lock:
+                self._names = names
+        return bool(names)
+
+    def warm(self):
+        """Load the index in the background, e.g. at worker start-up."""
+        self._refresh.schedule()
+
+    def lookup(self, query):
+        """Return ``{"movie": id, "tv": id}`` for a query; either may be missing.
+
+        Exact names win, then aliases, then the shortest name the query is a
+        prefix of, filling in each media type from the first source that has
+        it.
+        """
+        self._refresh.ensure()
+        names = self._names
+        key = normalize(query)
+        if not key:
+            return {}
+
+        found = dict(names.get(key, {}))
+        for target in ALIASES.get(key, []):
+            for media_type, gid in names.get(target, {}).items():
+                found.setdefault(media_type, gid)
+
+        if len(found) < len(MEDIA_TYPES) and len(key) >= 3:
+            for name in sorted(names, key=len):
+                if name.startswith(key):
+                    for media_type, gid in names[name].items():
+                        found.setdefault(media_type, gid)
+        return found
+
+
+genre_index = GenreIndex()
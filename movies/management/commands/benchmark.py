@@ -0,0 +1,242 @@
+import json
+import random
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer,
+    WSGIRequestHandler,
+    get_internal_wsgi_application,
+)
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from movies import tmdb
+from movies.fake_tmdb import FakeTMDB, list_item
+from movies.models import Favorite
+
+# name -> (needs a logged-in user, path for the i-th request)
+SCENARIOS = {
+    "home": (False, lambda i: "/"),
+    "search": (False, lambda i: f"/?q=query{i % 20}&type=title"),
+    "details": (False, lambda i: f"/details/{1000 + i % 50}/movie/"),
+    "actor_search": (False, lambda i: f"/actor/{1 + i % 30}/Person/"),
+    "suggestions": (True, lambda i: "/suggestions/"),
+}
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def percentile(sorted_values, pct):
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    return statistics.quantiles(sorted_values, n=100, method="inclusive")[pct - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the main views against a local fake TMDB server. Runs "
+        "offline in a throwaway test database and reports throughput, "
+        "latency percentiles and TMDB calls per request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "scenarios",
+            nargs="*",
+            metavar="view",
+            help=f"Views to drive (default: all of {', '.join(SCENARIOS)}).",
+        )
+        parser.add_argument("--requests", type=int, default=200, help="Per view.")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=50,
+            metavar="MS",
+            help="Delay the fake TMDB adds to every response.",
+        )
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument(
+            "--favorites", type=int, default=20, help="Favorites seeded per user."
+        )
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Clear the TMDB and fragment caches before each view.",
+        )
+        parser.add_argument("--json", metavar="PATH", help="Also write results here.")
+        parser.add_argument(
+            "--max-p95",
+            type=float,
+            metavar="MS",
+            help="Fail if any view's p95 latency exceeds this (regression gate).",
+        )
+
+    def handle(self, *args, **options):
+        scenarios = options["scenarios"] or list(SCENARIOS)
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown view(s): {', '.join(sorted(unknown))}")
+        fake = FakeTMDB(latency=options["latency"] / 1000).start()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            if connection.vendor == "sqlite":
+                # A file, not shared in-memory SQLite, so server threads can
+                # write concurrently. Immediate transactions wait on the write
+                # lock instead of failing an upgrade with "database is locked".
+                db = connection.settings_dict
+                db["TEST"]["NAME"] = str(Path(tmp) / "bench.db")
+                db["OPTIONS"].setdefault("timeout", 30)
+                db["OPTIONS"].setdefault("transaction_mode", "IMMEDIATE")
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            # The fake server is the only TMDB: never replay or record.
+            overrides = override_settings(
+                TMDB_BASE_URL=fake.url,
+                TMDB_API_KEY="benchmark",
+                TMDB_REPLAY_MODE="",
+                TMDB_RATE_LIMIT=0,
+                TMDB_GLOBAL_RATE_LIMIT=0,
+                ALLOWED_HOSTS=["127.0.0.1", "localhost"],
+                POSTER_PROXY=False,
+            )
+            overrides.enable()
+            tmdb._client = None
+            server = None
+            try:
+                cookies = self._seed(options["users"], options["favorites"])
+                server = ThreadedWSGIServer(("127.0.0.1", 0), QuietHandler)
+                server.set_app(get_internal_wsgi_application())
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                base = "http://127.0.0.1:%s" % server.server_address[1]
+
+                results = [
+                    self._run(name, base, cookies, fake, options) for name in scenarios
+                ]
+            finally:
+                if server is not None:
+                    server.shutdown()
+                    server.server_close()
+                overrides.disable()
+                tmdb._client = None
+                fake.stop()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self._report(results)
+        if options["json"]:
+            Path(options["json"]).write_text(json.dumps(results, indent=2))
+        if options["max_p95"] is not None:
+            slow = [r["view"] for r in results if r["p95_ms"] > options["max_p95"]]
+            if slow:
+                raise CommandError(
+                    f"p95 above {options['max_p95']}ms for: {', '.join(slow)}"
+                )
+
+    def _seed(self, n_users, n_favorites):
+        """Create users with favorites; return their session cookies."""
+        rng = random.Random(0)
+        User.objects.bulk_create([User(username=f"bench{i}") for i in range(n_users)])
+        users = list(User.objects.filter(username__startswith="bench"))
+        favorites = []
+        for user in users:
+            for tmdb_id in rng.sample(range(1000, 1500), n_favorites):
+                item = list_item(tmdb_id, "movie")
+                favorites.append(
+                    Favorite(
+                        user=user,
+                        tmdb_id=tmdb_id,
+                        media_type="movie",
+                        title=item["title"],
+                        poster_url=f"{tmdb.IMAGE_BASE}{item['poster_path']}",
+                    )
+                )
+        Favorite.objects.bulk_create(favorites)
+
+        cookies = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            cookies.append(
+                {
+                    settings.SESSION_COOKIE_NAME: client.cookies[
+                        settings.SESSION_COOKIE_NAME
+                    ].value
+                }
+            )
+        return cookies
+
+    def _run(self, name, base, cookies, fake, options):
+        logged_in, path_for = SCENARIOS[name]
+        if logged_in and not cookies:
+            raise CommandError(f"{name} needs at least one seeded user.")
+        if options["cold"]:
+            for alias in (settings.TMDB_CACHE_ALIAS, "template_fragments"):
+                caches[alias].clear()
+
+        local = threading.local()
+
+        def one(i):
+            session = getattr(local, "session", None)
+            if session is None:
+                session = local.session = requests.Session()
+            jar = cookies[i % len(cookies)] if logged_in else None
+            started = time.perf_counter()
+            res = session.get(
+                base + path_for(i), cookies=jar, allow_redirects=False, timeout=60
+            )
+            return time.perf_counter() - started, res.status_code
+
+        calls_before = fake.total_calls
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            samples = list(pool.map(one, range(options["requests"])))
+        wall = time.perf_counter() - started
+
+        latencies = sorted(seconds * 1000 for seconds, _ in samples)
+        errors = sum(1 for _, status in samples if status >= 400)
+        return {
+            "view": name,
+            "requests": len(samples),
+            "errors": errors,
+            "rps": round(len(samples) / wall, 1),
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "tmdb_calls_per_request": round(
+                (fake.total_calls - calls_before) / len(samples), 2
+            ),
+        }
+
+    def _report(self, results):
+        columns = (
+            ("view", 14),
+            ("requests", 9),
+            ("errors", 7),
+            ("rps", 8),
+            ("p50_ms", 9),
+            ("p95_ms", 9),
+            ("p99_ms", 9),
+            ("tmdb_calls_per_request", 10),
+        )
+        header = "".join(
+            f"{'tmdb/req' if key.startswith('tmdb') else key:>{width}}"
+            for key, width in columns
+        )
+        self.stdout.write(header)
+        for row in results:
+            self.stdout.write("".join(f"{row[key]:>{width}}" for key, width in columns))
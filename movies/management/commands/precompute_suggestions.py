@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.utils import timezone
+
+from movies.recommend import precompute
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute suggestion snapshots for users with favorites. "
+        "Safe to run from a scheduler (e.g. Heroku Scheduler) off-peak."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames", nargs="*", help="Only these users (default: all)."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Snapshots written per database round trip.",
+        )
+        parser.add_argument(
+            "--older-than",
+            type=float,
+            default=None,
+            metavar="HOURS",
+            help=(
+                "Skip users whose snapshot is newer than this many hours "
+                "and still matches their favorites."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(favorites__isnull=False).distinct()
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+        if options["older_than"] is not None:
+            cutoff = timezone.now() - timedelta(hours=options["older_than"])
+            users = users.filter(
+                Q(suggestion_snapshot__isnull=True)
+                | Q(suggestion_snapshot__generated_at__lt=cutoff)
+                | Q(
+                    suggestion_snapshot__favorites_changed_at__gte=F(
+                        "suggestion_snapshot__generated_at"
+                    )
+                )
+            )
+
+        written = precompute(users.iterator(), batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Precomputed {written} snapshot(s)."))
@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from movies.taste import rebuild_profile
+
+
+class Command(BaseCommand):
+    help = "Rebuild users' taste profiles from their favorites."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames", nargs="*", help="Only rebuild these users (default: all)."
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(favorites__isnull=False).distinct()
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+
+        count = 0
+        for user in users.iterator():
+            rebuild_profile(user)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} taste profile(s)."))
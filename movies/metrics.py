@@ -0,0 +1,227 @@
+import re
+import threading
+import time
+from collections import Counter as _Counts
+from contextvars import ContextVar
+
+# Seconds; shared by every latency histogram.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, doc, labels=()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = _Counts()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] += amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labels, key)} {value}"
+
+
+class Histogram:
+    def __init__(self, name, doc, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0, 0.0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        with self._lock:
+            series = {
+                key: (list(counts), n, total)
+                for key, (counts, n, total) in self._series.items()
+            }
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} histogram"
+        names = self.labels + ("le",)
+        for key, (counts, n, total) in sorted(series.items()):
+            for bound, count in zip(self.buckets, counts):
+                yield f"{self.name}_bucket{_labels(names, key + (bound,))} {count}"
+            yield f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {n}"
+            yield f"{self.name}_sum{_labels(self.labels, key)} {total}"
+            yield f"{self.name}_count{_labels(self.labels, key)} {n}"
+
+
+REQUEST_SECONDS = Histogram(
+    "screensense_request_duration_seconds",
+    "Time to produce a response, by view.",
+    ("view", "method", "status"),
+)
+VIEW_TMDB_CALLS = Counter(
+    "screensense_view_tmdb_calls_total",
+    "TMDB requests made while serving each view.",
+    ("view",),
+)
+VIEW_DB_QUERIES = Counter(
+    "screensense_view_db_queries_total",
+    "Database queries run while serving each view.",
+    ("view",),
+)
+VIEW_DB_SECONDS = Histogram(
+    "screensense_view_db_seconds",
+    "Database time spent per request, by view.",
+    ("view",),
+)
+TMDB_SECONDS = Histogram(
+    "screensense_tmdb_request_duration_seconds",
+    "TMDB request latency by endpoint and outcome (ok, error, skipped).",
+    ("endpoint", "outcome"),
+)
+CACHE_LOOKUPS = Counter(
+    "screensense_tmdb_cache_lookups_total",
+    "TMDB response cache lookups by TTL class and result.",
+    ("cache", "result"),
+)
+
+METRICS = (
+    REQUEST_SECONDS,
+    VIEW_TMDB_CALLS,
+    VIEW_DB_QUERIES,
+    VIEW_DB_SECONDS,
+    TMDB_SECONDS,
+    CACHE_LOOKUPS,
+)
+
+
+class RequestStats:
+    """Upstream work done on behalf of one request.
+
+    Shared by every thread the request's view hands work to, so updates
+    take a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tmdb_calls = 0
+        self.tmdb_seconds = 0.0
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.cache = _Counts()
+
+    def add_tmdb(self, seconds):
+        with self._lock:
+            self.tmdb_calls += 1
+            self.tmdb_seconds += seconds
+
+    def add_db(self, seconds):
+        with self._lock:
+            self.db_queries += 1
+            self.db_seconds += seconds
+
+    def add_cache(self, result):
+        with self._lock:
+            self.cache[result] += 1
+
+    def server_timing(self, total):
+        """Value for a ``Server-Timing`` header (durations in ms)."""
+        cache = " ".join(f"{k}={v}" for k, v in sorted(self.cache.items()))
+        parts = [
+            f"app;dur={total * 1000:.1f}",
+            f'tmdb;dur={self.tmdb_seconds * 1000:.1f};desc="{self.tmdb_calls} calls"',
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"',
+        ]
+        if cache:
+            parts.append(f'cache;desc="{cache}"')
+        return ", ".join(parts)
+
+
+_current = ContextVar("request_stats", default=None)
+
+
+def start_request():
+    """Start collecting stats for the current request; returns a reset token."""
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def record_tmdb(path, seconds, outcome):
+    TMDB_SECONDS.observe(
+        seconds, endpoint=ID_SEGMENT.sub("/{id}", path), outcome=outcome
+    )
+    stats = _current.get()
+    if stats is not None and outcome != "skipped":
+        stats.add_tmdb(seconds)
+
+
+def record_cache(ttl_class, result):
+    CACHE_LOOKUPS.inc(cache=ttl_class, result=result)
+    stats = _current.get()
+    if stats is not None:
+        stats.add_cache(result)
+
+
+def record_view(view, method, status, seconds, stats):
+    REQUEST_SECONDS.observe(seconds, view=view, method=method, status=status)
+    VIEW_TMDB_CALLS.inc(stats.tmdb_calls, view=view)
+    VIEW_DB_QUERIES.inc(stats.db_queries, view=view)
+    VIEW_DB_SECONDS.observe(stats.db_seconds, view=view)
+
+
+def db_timer(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` hook timing every query."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_db(time.perf_counter() - started)
+
+
+def install_db_timer(sender, connection, **kwargs):
+    """``connection_created`` receiver adding ``db_timer`` to new connections."""
+    if db_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_timer)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,56 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import metrics
+
+
+class MetricsMiddleware:
+    """Time each request and tally the TMDB, DB and cache work behind it.
+
+    Totals feed the in-process metrics served on ``/metrics``; with
+    ``settings.SERVER_TIMING`` they are also sent to the browser as a
+    ``Server-Timing`` header.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        stats, token = metrics.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self._finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        stats, token = metrics.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self._finish(request, response, stats, started)
+
+    def _finish(self, request, response, stats, started):
+        elapsed = time.perf_counter() - started
+        match = getattr(request, "resolver_match", None)
+        # Static files and 404s for unknown URLs would only add noise.
+        if match is not None and match.view_name != "metrics":
+            metrics.record_view(
+                match.view_name, request.method, response.status_code, elapsed, stats
+            )
+        if settings.SERVER_TIMING:
+            response["Server-Timing"] = stats.server_timing(elapsed)
+        return response
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_tasteprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Title',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tmdb_id', models.IntegerField()),
+                ('media_type', models.CharField(max_length=20)),
+                ('title', models.CharField(max_length=255)),
+                ('poster_path', models.CharField(blank=True, max_length=255, null=True)),
+                ('release_date', models.DateField(blank=True, null=True)),
+                ('genres', models.JSONField(default=list)),
+                ('keywords', models.JSONField(default=list)),
+                ('people', models.JSONField(default=dict)),
+                ('runtime', models.IntegerField(blank=True, null=True)),
+                ('fetched_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('tmdb_id', 'media_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_title'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuggestionSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('personalized', models.JSONField(default=list)),
+                ('items', models.JSONField(default=list)),
+                ('generated_at', models.DateTimeField()),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='suggestion_snapshot', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0006_suggestionsnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Person",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("tmdb_id", models.IntegerField(unique=True)),
+                ("name", models.CharField(max_length=255)),
+                ("aliases", models.JSONField(default=list)),
+                ("popularity", models.FloatField(default=0)),
+                ("fetched_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
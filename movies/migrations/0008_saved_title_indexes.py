@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0007_person'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['user', '-added_at', '-id'], name='movies_fav_user_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['user', 'media_type', '-added_at', '-id'], name='movies_fav_user_media_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watchlist',
+            index=models.Index(fields=['user', '-added_at', '-id'], name='movies_wl_user_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watchlist',
+            index=models.Index(fields=['user', 'media_type', '-added_at', '-id'], name='movies_wl_user_media_idx'),
+        ),
+    ]
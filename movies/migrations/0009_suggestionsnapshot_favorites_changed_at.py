@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0008_saved_title_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='suggestionsnapshot',
+            name='favorites_changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
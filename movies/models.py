@@ -12,6 +12,15 @@ class Favorite(models.Model):
 
     class Meta:
         unique_together = ("user", "tmdb_id", "media_type")
+        indexes = [
+            models.Index(
+                fields=["user", "-added_at", "-id"], name="movies_fav_user_added_idx"
+            ),
+            models.Index(
+                fields=["user", "media_type", "-added_at", "-id"],
+                name="movies_fav_user_media_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.media_type}) - {self.user.username}"
@@ -27,6 +36,105 @@ class Watchlist(models.Model):
 
     class Meta:
         unique_together = ("user", "tmdb_id", "media_type")
+        indexes = [
+            models.Index(
+                fields=["user", "-added_at", "-id"], name="movies_wl_user_added_idx"
+            ),
+            models.Index(
+                fields=["user", "media_type", "-added_at", "-id"],
+                name="movies_wl_user_media_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"[To-Watch] {self.title} ({self.media_type}) - {self.user.username}"
+
+
+class TasteProfile(models.Model):
+    """Weighted genre/keyword/person counts derived from a user's favorites.
+
+    Counts are stored as ``{str(tmdb_id): weight}`` and maintained
+    incrementally as favorites are added and removed (see ``movies.taste``).
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name="taste_profile"
+    )
+    genres = models.JSONField(default=dict)
+    keywords = models.JSONField(default=dict)
+    people = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Taste profile - {self.user.username}"
+
+
+class Title(models.Model):
+    """Local copy of TMDB metadata for a movie or TV title.
+
+    Rows are upserted from details payloads the app already fetches, so
+    saving a title and listing saved titles don't need another TMDB call.
+    ``people`` maps person ids to the weight used by taste profiles.
+    """
+
+    tmdb_id = models.IntegerField()
+    media_type = models.CharField(max_length=20)
+    title = models.CharField(max_length=255)
+    poster_path = models.CharField(max_length=255, blank=True, null=True)
+    release_date = models.DateField(blank=True, null=True)
+    genres = models.JSONField(default=list)
+    keywords = models.JSONField(default=list)
+    people = models.JSONField(default=dict)
+    runtime = models.IntegerField(blank=True, null=True)
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("tmdb_id", "media_type")
+
+    def __str__(self):
+        return f"{self.title} ({self.media_type})"
+
+
+class Person(models.Model):
+    """A TMDB person the app has resolved from an actor search.
+
+    ``aliases`` holds alternative spellings (original names and queries
+    that resolved to this person) so they can be matched locally.
+    """
+
+    tmdb_id = models.IntegerField(unique=True)
+    name = models.CharField(max_length=255)
+    aliases = models.JSONField(default=list)
+    popularity = models.FloatField(default=0)
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class SuggestionSnapshot(models.Model):
+    """Precomputed suggestions for one user.
+
+    ``personalized`` feeds the home and upcoming pages, ``items`` the
+    suggestions page. Rebuilt by ``precompute_suggestions``, and in the
+    background once a favorites change (``favorites_changed_at``) makes
+    it stale.
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name="suggestion_snapshot"
+    )
+    personalized = models.JSONField(default=list)
+    items = models.JSONField(default=list)
+    generated_at = models.DateTimeField()
+    favorites_changed_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def is_stale(self):
+        return (
+            self.favorites_changed_at is not None
+            and self.favorites_changed_at >= self.generated_at
+        )
+
+    def __str__(self):
+        return f"Suggestions - {self.user.username}"
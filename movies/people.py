@@ -0,0 +1,143 @@
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from .genres import normalize
+from .models import Person
+from .refresh import Refresher
+
+# TMDB candidates below this similarity aren't preferred over its own ranking.
+CANDIDATE_THRESHOLD = 0.4
+
+
+def trigrams(key):
+    """Character trigrams of a normalized name, padded at word edges."""
+    padded = f" {key} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(grams, other):
+    """Jaccard similarity of two trigram sets."""
+    shared = len(grams & other)
+    return shared / (len(grams) + len(other) - shared) if shared else 0.0
+
+
+def score_candidates(query, names):
+    """Trigram similarity of ``query`` to each of ``names``, as an array.
+
+    Shared trigrams are counted for all candidates at once with a
+    ``bincount`` over the candidates' trigrams that also occur in the query.
+    """
+    grams = trigrams(normalize(query))
+    name_grams = [trigrams(normalize(name)) for name in names]
+    owners = [
+        i for i, other in enumerate(name_grams) for gram in other if gram in grams
+    ]
+    shared = np.bincount(np.asarray(owners, dtype=np.intp), minlength=len(names))
+    sizes = np.fromiter((len(other) for other in name_grams), np.intp, len(names))
+    union = len(grams) + sizes - shared
+    return np.divide(
+        shared, union, out=np.zeros(len(names)), where=(shared > 0) & (union > 0)
+    )
+
+
+def best_candidate(query, candidates, threshold=CANDIDATE_THRESHOLD):
+    """Return the ``/search/person`` result whose name best matches ``query``.
+
+    Ties go to the more popular person. Returns None when no name scores
+    above ``threshold``.
+    """
+    candidates = [c for c in candidates if c.get("id") and c.get("name")]
+    if not candidates:
+        return None
+    scores = score_candidates(query, [c["name"] for c in candidates])
+    popularity = np.array([c.get("popularity") or 0 for c in candidates], dtype=float)
+    # lexsort's last key is primary: best score, then most popular, wins.
+    best = np.lexsort((popularity, scores))[-1]
+    return candidates[best] if scores[best] > threshold else None
+
+
+class PersonIndex:
+    """In-process map of names to people earlier actor searches resolved to.
+
+    Only the person a search chose is stored, under their name, original
+    name and every query that resolved to them, so a repeated search (a
+    misspelling included) is a dict lookup with no TMDB call. Anything
+    else goes to TMDB: fuzzy scores can't tell a typo from a different
+    person with a similar name. Loaded on first use, rebuilt in the
+    background once ``settings.PERSON_INDEX_REFRESH`` seconds have passed,
+    and extended in place as searches resolve new people.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh = Refresher(self.build, lambda: settings.PERSON_INDEX_REFRESH)
+        self._people = {}
+        self._exact = {}
+
+    @staticmethod
+    def _add(people, exact, tmdb_id, name, popularity, spellings):
+        people[tmdb_id] = (name, popularity)
+        for spelling in spellings:
+            key = normalize(spelling)
+            if not key:
+                continue
+            current = exact.get(key)
+            if current is None or (
+                current != tmdb_id and people[current][1] < popularity
+            ):
+                exact[key] = tmdb_id
+
+    def build(self):
+        people, exact = {}, {}
+        rows = Person.objects.values_list("tmdb_id", "name", "popularity", "aliases")
+        for tmdb_id, name, popularity, aliases in rows.iterator():
+            self._add(people, exact, tmdb_id, name, popularity, [name, *aliases])
+        with self._lock:
+            self._people, self._exact = people, exact
+
+    def lookup(self, query):
+        """Return ``(tmdb_id, name)`` for a known name or alias, or None."""
+        self._refresh.ensure()
+        key = normalize(query)
+        if not key:
+            return None
+        with self._lock:
+            tmdb_id = self._exact.get(key)
+            if tmdb_id is None:
+                return None
+            return tmdb_id, self._people[tmdb_id][0]
+
+    def learn(self, chosen, query=None):
+        """Store the ``/search/person`` result a search for ``query`` chose."""
+        if not chosen.get("id") or not chosen.get("name"):
+            return
+        tmdb_id, name = chosen["id"], chosen["name"][:255]
+        existing = Person.objects.filter(tmdb_id=tmdb_id).first()
+        aliases = list(existing.aliases) if existing else []
+        for alias in (chosen.get("original_name"), query):
+            if alias and alias != name and alias not in aliases:
+                aliases.append(alias)
+
+        person, _ = Person.objects.update_or_create(
+            tmdb_id=tmdb_id,
+            defaults={
+                "name": name,
+                "aliases": aliases,
+                "popularity": chosen.get("popularity") or 0,
+            },
+        )
+        if self._refresh.built:
+            with self._lock:
+                self._add(
+                    self._people,
+                    self._exact,
+                    person.tmdb_id,
+                    person.name,
+                    person.popularity,
+                    [person.name, *person.aliases],
+                )
+
+
+person_index = PersonIndex()
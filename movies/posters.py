@@ -0,0 +1,126 @@
+import os
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.urls import reverse
+
+from .tmdb import IMAGE_ROOT, SingleFlight, get_client
+
+# TMDB image widths offered to browsers through srcset.
+GRID_SIZES = ("w92", "w154", "w185", "w342", "w500")
+PROXY_SIZES = frozenset(GRID_SIZES + ("w780", "original"))
+
+IMAGE_FILE = re.compile(r"[A-Za-z0-9_-]+\.(?:jpe?g|png|webp|svg)")
+TMDB_IMAGE = re.compile(
+    rf"^(?:{re.escape(IMAGE_ROOT)}/[a-z0-9]+)?/({IMAGE_FILE.pattern})$"
+)
+
+
+def image_file(url):
+    """Return the TMDB file name of an image URL or path, or None."""
+    match = TMDB_IMAGE.match(url or "")
+    return match.group(1) if match else None
+
+
+@lru_cache(maxsize=4096)
+def image_url(size, name):
+    if settings.POSTER_PROXY:
+        return reverse("poster", args=[size, name])
+    return f"{IMAGE_ROOT}/{size}/{name}"
+
+
+def poster_src(url, size="w342"):
+    """Rewrite a TMDB image URL (or bare path) to the given width.
+
+    Anything that isn't a TMDB image is returned unchanged.
+    """
+    name = image_file(url)
+    return image_url(size, name) if name else url or ""
+
+
+def poster_srcset(url, sizes=GRID_SIZES):
+    name = image_file(url)
+    if not name:
+        return ""
+    return ", ".join(f"{image_url(size, name)} {size[1:]}w" for size in sizes)
+
+
+class PosterCache:
+    """Size-bounded on-disk cache of TMDB images behind the poster proxy.
+
+    Files live under ``root/<size>/<name>``. Serving a file bumps its
+    mtime, and once the total passes ``max_bytes`` the least recently
+    served files are removed until it is back under 90% of the limit.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._total = None
+
+    def get(self, size, name):
+        """Return the local path of an image, downloading it if needed."""
+        path = self.root / size / name
+        try:
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            return self._flight.do(str(path), lambda: self._download(size, name, path))
+
+    def _download(self, size, name, path):
+        if path.exists():
+            return path
+        client = get_client()
+        try:
+            r = client.session.get(
+                f"{IMAGE_ROOT}/{size}/{name}", timeout=client.timeout
+            )
+        except requests.RequestException:
+            return None
+        if r.status_code != 200:
+            return None
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{name}.{threading.get_ident()}")
+        tmp.write_bytes(r.content)
+        os.replace(tmp, path)
+        self._added(len(r.content))
+        return path
+
+    def _files(self):
+        for path in self.root.glob("*/*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            yield path, stat.st_mtime, stat.st_size
+
+    def _added(self, size):
+        with self._lock:
+            if self._total is None:
+                self._total = sum(n for _, _, n in self._files())
+            else:
+                self._total += size
+            if self._total <= self.max_bytes:
+                return
+
+            files = sorted(self._files(), key=lambda f: f[1])
+            self._total = sum(n for _, _, n in files)
+            target = self.max_bytes * 0.9
+            for path, _, n in files:
+                if self._total <= target:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                self._total -= n
+
+
+poster_cache = PosterCache(settings.POSTER_CACHE_DIR, settings.POSTER_CACHE_MAX_BYTES)
@@ -0,0 +1,290 @@
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from random import shuffle
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .cooccurrence import cooccurrence_index
+from .engine import content_engine
+from .models import Favorite, SuggestionSnapshot
+from .taste import get_profile
+from .tmdb import IMAGE_BASE, fetch_many, get_client
+
+PERSONALIZED_LIMIT = 10
+PERSONALIZED_CANDIDATES = 20
+SUGGESTIONS_LIMIT = 40
+COLLABORATIVE_LIMIT = 12
+RECOMMENDATION_SOURCES = 6
+
+logger = logging.getLogger(__name__)
+
+# Snapshots made stale by a favorites change are rebuilt here, off the
+# request, one user at a time.
+_rebuilder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="suggestions")
+_rebuilding = set()
+_rebuilding_lock = threading.Lock()
+
+
+def discover_suggestions(user):
+    """Query /discover with the user's top taste-profile features."""
+    tmdb = get_client()
+    profile = get_profile(user)
+    genre_counts = Counter(profile.genres)
+    keyword_counts = Counter(profile.keywords)
+    person_counts = Counter(profile.people)
+
+    top_genres = [gid for gid, _ in genre_counts.most_common(3)]
+    top_keywords = [kid for kid, _ in keyword_counts.most_common(5)]
+    top_people = [pid for pid, _ in person_counts.most_common(3)]
+
+    media_types = ["movie", "tv"]
+    discover_calls = [
+        partial(
+            tmdb.discover,
+            media_type,
+            with_genres=",".join(top_genres),
+            with_keywords=",".join(top_keywords),
+            with_people=",".join(top_people),
+            sort_by="popularity.desc",
+            include_adult="false",
+            language="en-US",
+            page=1,
+            **{"vote_count.gte": 50},
+        )
+        for media_type in media_types
+    ]
+
+    suggestions = []
+    for media_type, data in zip(media_types, fetch_many(discover_calls)):
+        if not data:
+            continue
+        for item in data.get("results", [])[:10]:
+            poster = item.get("poster_path")
+            if not poster:
+                continue
+            suggestions.append(
+                {
+                    "id": item.get("id"),
+                    "title": item.get("title") or item.get("name"),
+                    "poster": f"{IMAGE_BASE}{poster}",
+                    "media_type": media_type,
+                }
+            )
+    return suggestions
+
+
+def get_personalized_suggestions(user, favorites=None):
+    """Up to ten suggestions, ranked locally by the content engine.
+
+    Falls back to TMDB /discover when the local catalogue doesn't have
+    enough similar titles yet.
+    """
+    if favorites is None:
+        favorites = list(Favorite.objects.filter(user=user))
+    if not favorites:
+        return []
+
+    favorite_keys = {(f.media_type, f.tmdb_id) for f in favorites}
+    suggestions = content_engine.recommend(favorite_keys, k=PERSONALIZED_CANDIDATES)
+    if len(suggestions) < PERSONALIZED_LIMIT:
+        suggestions += discover_suggestions(user)
+
+    seen = set()
+    unique = []
+    for s in suggestions:
+        key = (s["media_type"], s["id"])
+        if key not in seen and key not in favorite_keys:
+            seen.add(key)
+            unique.append(s)
+
+    shuffle(unique)
+    return unique[:PERSONALIZED_LIMIT]
+
+
+def _recommendation_items(media_type, res):
+    items = []
+    for item in res.get("results", [])[:10]:
+        poster = item.get("poster_path")
+        if not poster:
+            continue
+        items.append(
+            {
+                "id": item.get("id"),
+                "title": item.get("title") or item.get("name"),
+                "poster": f"{IMAGE_BASE}{poster}",
+                "media_type": item.get("media_type") or media_type,
+            }
+        )
+    return items
+
+
+def title_recommendations(sources):
+    """Map ``(media_type, tmdb_id)`` to its trimmed recommendation list.
+
+    The raw pages come through the client's ``details`` cache, shared by
+    every user who favorited the title; lists are trimmed on read and
+    uncached titles are fetched concurrently.
+    """
+    tmdb = get_client()
+    calls = [partial(tmdb.recommendations, mt, tmdb_id) for mt, tmdb_id in sources]
+    return {
+        src: _recommendation_items(src[0], res)
+        for src, res in zip(sources, fetch_many(calls))
+        if res is not None
+    }
+
+
+def more_like_favorites(favorites):
+    """TMDB recommendations for the user's most recently added favorites."""
+    latest = sorted(favorites, key=lambda f: f.added_at, reverse=True)
+    sources = [(f.media_type, f.tmdb_id) for f in latest[:RECOMMENDATION_SOURCES]]
+    recs = title_recommendations(sources)
+    return [item for src in sources for item in recs.get(src, [])]
+
+
+def build_snapshot(user):
+    """Compute a user's suggestions; returns an unsaved SuggestionSnapshot.
+
+    ``generated_at`` is taken before the favorites are read, so a change
+    made while the build runs is never mistaken for one it already saw.
+    """
+    started = timezone.now()
+    favorites = list(Favorite.objects.filter(user=user))
+    base = get_personalized_suggestions(user, favorites)
+    more = more_like_favorites(favorites)
+
+    favorite_keys = {(f.media_type, f.tmdb_id) for f in favorites}
+    collaborative = cooccurrence_index.recommend(favorite_keys, n=COLLABORATIVE_LIMIT)
+    seen = {(x["media_type"], x["id"]) for x in base}
+    combined = base[:]
+    for s in collaborative + more:
+        key = (s["media_type"], s["id"])
+        if key not in seen and key not in favorite_keys:
+            seen.add(key)
+            combined.append(s)
+
+    return SuggestionSnapshot(
+        user=user,
+        personalized=base,
+        items=combined[:SUGGESTIONS_LIMIT],
+        generated_at=started,
+    )
+
+
+def save_snapshots(snapshots):
+    """Store ``snapshots``, returning how many were written.
+
+    An existing row is only replaced by a snapshot generated after both
+    it and the user's last favorites change, so a slow build can't
+    overwrite a newer one or bring back suggestions from old favorites.
+    """
+    snapshots = {s.user_id: s for s in snapshots}
+    existing = set(
+        SuggestionSnapshot.objects.filter(user_id__in=snapshots).values_list(
+            "user_id", flat=True
+        )
+    )
+    written = 0
+    with transaction.atomic():
+        for user_id in existing:
+            snapshot = snapshots[user_id]
+            written += (
+                SuggestionSnapshot.objects.filter(
+                    user_id=user_id, generated_at__lt=snapshot.generated_at
+                )
+                .exclude(favorites_changed_at__gte=snapshot.generated_at)
+                .update(
+                    personalized=snapshot.personalized,
+                    items=snapshot.items,
+                    generated_at=snapshot.generated_at,
+                )
+            )
+        created = SuggestionSnapshot.objects.bulk_create(
+            [s for user_id, s in snapshots.items() if user_id not in existing],
+            ignore_conflicts=True,
+        )
+    return written + len(created)
+
+
+def _without_favorites(snapshot, user):
+    """Drop titles the user has favorited since ``snapshot`` was built."""
+    favorite_keys = set(
+        Favorite.objects.filter(user=user).values_list("media_type", "tmdb_id")
+    )
+    for field in ("personalized", "items"):
+        setattr(
+            snapshot,
+            field,
+            [
+                s
+                for s in getattr(snapshot, field)
+                if (s["media_type"], s["id"]) not in favorite_keys
+            ],
+        )
+    return snapshot
+
+
+def _rebuild(user):
+    try:
+        save_snapshots([build_snapshot(user)])
+    except Exception:
+        logger.exception("Could not rebuild suggestions for user %s", user.pk)
+    finally:
+        with _rebuilding_lock:
+            _rebuilding.discard(user.pk)
+        connections.close_all()
+
+
+def rebuild_later(user):
+    """Queue a background rebuild of ``user``'s snapshot, once at a time."""
+    with _rebuilding_lock:
+        if user.pk in _rebuilding:
+            return
+        _rebuilding.add(user.pk)
+    _rebuilder.submit(_rebuild, user)
+
+
+def get_snapshot(user):
+    """Return the user's stored snapshot, computing it live if there is none.
+
+    A snapshot made stale by a favorites change is still served, minus
+    the titles favorited since, while a fresh one is built in the
+    background.
+    """
+    snapshot = SuggestionSnapshot.objects.filter(user=user).first()
+    if snapshot is None:
+        snapshot = build_snapshot(user)
+        save_snapshots([snapshot])
+        return snapshot
+    if snapshot.is_stale:
+        rebuild_later(user)
+    return _without_favorites(snapshot, user)
+
+
+def mark_stale(user):
+    """Note that ``user``'s favorites changed after their snapshot was built."""
+    SuggestionSnapshot.objects.filter(user=user).update(
+        favorites_changed_at=timezone.now()
+    )
+
+
+def precompute(users, batch_size=50):
+    """Rebuild and store snapshots for ``users``, writing one batch at a time.
+
+    Returns the number of snapshots written. Meant for off-peak runs from
+    the ``precompute_suggestions`` command or a scheduler.
+    """
+    written = 0
+    batch = []
+    for user in users:
+        batch.append(build_snapshot(user))
+        if len(batch) >= batch_size:
+            written += save_snapshots(batch)
+            batch = []
+    if batch:
+        written += save_snapshots(batch)
+    return written
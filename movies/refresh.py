@@ -0,0 +1,84 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Expired per-worker indexes are rebuilt here, off the request, one at a time.
+_rebuilder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="refresh")
+
+
+class Refresher:
+    """Keep some per-worker state rebuilt every ``ttl()`` seconds.
+
+    The first caller builds it inline, since there is nothing to serve
+    yet, and callers arriving meanwhile wait for that one build. Once
+    built, a caller that finds it expired queues a single rebuild in the
+    background and carries on with the current state, which ``build``
+    swaps out only when the new one is ready. ``build`` may return
+    ``False`` to report it loaded nothing; the state is then tried again
+    on the next call.
+    """
+
+    def __init__(self, build, ttl):
+        self._build = build
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._running = None
+
+    @property
+    def built(self):
+        return self._built_at is not None
+
+    def _run(self):
+        try:
+            if self._build() is not False:
+                self._built_at = time.monotonic()
+        except Exception:
+            logger.exception("Could not rebuild %s", self._build.__qualname__)
+
+    def _finish(self, done):
+        with self._lock:
+            self._running = None
+        done.set()
+
+    def ensure(self):
+        """Build on first use, or queue a rebuild once the state expires."""
+        built_at = self._built_at
+        if built_at is not None and time.monotonic() - built_at <= self._ttl():
+            return
+        with self._lock:
+            done = self._running
+            leader = done is None
+            if leader:
+                done = self._running = threading.Event()
+        if built_at is not None:
+            if leader:
+                _rebuilder.submit(self._rebuild, done)
+            return
+        if leader:
+            try:
+                self._run()
+            finally:
+                self._finish(done)
+        else:
+            done.wait()
+
+    def _rebuild(self, done):
+        try:
+            self._run()
+        finally:
+            self._finish(done)
+            connections.close_all()
+
+    def schedule(self):
+        """Queue a build in the background unless one is already running."""
+        with self._lock:
+            if self._running is not None:
+                return
+            done = self._running = threading.Event()
+        _rebuilder.submit(self._rebuild, done)
@@ -0,0 +1,114 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+def split_appended(params):
+    """Return ``(params, parts)`` with ``append_to_response`` taken out."""
+    params = dict(params)
+    appended = params.pop("append_to_response", "")
+    return params, [part for part in appended.split(",") if part]
+
+
+class Recordings:
+    """On-disk store of TMDB responses for offline, deterministic runs.
+
+    Each resource is one gzipped JSON file named after the digest of its
+    ``key(path, params)`` (the client's ``cache_key``), so names never
+    include the ``api_key``. Parts of an ``append_to_response`` call are
+    stored as the sub-resources they are (``/movie/1/credits``), so which
+    parts a call asks for together, which depends on what the process
+    already had cached, doesn't matter on replay.
+
+    In ``record`` mode the client saves every successful response; in
+    ``replay`` mode it only reads them back, sleeping ``latency`` seconds
+    per call to stand in for the network. A request whose base resource
+    was never recorded fails like a TMDB error; unrecorded parts are left
+    out, as TMDB does for parts it has no data for.
+    """
+
+    def __init__(self, root, mode, key, latency=0.0):
+        self.root = Path(root)
+        self.mode = mode
+        self.key = key
+        self.latency = latency
+
+    @property
+    def replaying(self):
+        return self.mode == REPLAY
+
+    def _file(self, path, params):
+        digest = self.key(path, params).removeprefix("tmdb:")
+        return self.root / f"{digest}.json.gz"
+
+    def _read(self, path, params):
+        try:
+            with gzip.open(self._file(path, params), "rt", encoding="utf-8") as f:
+                return json.load(f)["data"]
+        except FileNotFoundError:
+            logger.warning("No recorded TMDB response for %s", path)
+        except (OSError, ValueError, KeyError):
+            logger.warning("Unreadable TMDB recording for %s", path)
+        return None
+
+    def _write(self, path, params, data):
+        target = self._file(path, params)
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}")
+        entry = {"path": path, "params": params, "data": data}
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                json.dump(entry, f, separators=(",", ":"))
+            os.replace(tmp, target)
+        except OSError as exc:
+            logger.warning("Could not record TMDB response for %s: %s", path, exc)
+
+    def load(self, path, params):
+        if self.latency:
+            time.sleep(self.latency)
+        params, parts = split_appended(params)
+        data = self._read(path, params)
+        if data is None or not parts:
+            return data
+        data = dict(data)
+        for part in parts:
+            value = self._read(f"{path}/{part}", {})
+            if value is not None:
+                data[part] = value
+        return data
+
+    def save(self, path, params, data):
+        params, parts = split_appended(params)
+        self._write(path, params, {k: v for k, v in data.items() if k not in parts})
+        for part in parts:
+            if part in data:
+                self._write(f"{path}/{part}", {}, data[part])
+
+
+def from_settings(key):
+    """The store selected by ``TMDB_REPLAY_MODE``, or None when it's off.
+
+    ``key(path, params)`` names a recorded resource.
+    """
+    mode = settings.TMDB_REPLAY_MODE
+    if not mode:
+        return None
+    if mode not in (RECORD, REPLAY):
+        raise ImproperlyConfigured(
+            f"TMDB_REPLAY_MODE must be '', '{RECORD}' or '{REPLAY}', not {mode!r}."
+        )
+    return Recordings(
+        settings.TMDB_REPLAY_DIR, mode, key, settings.TMDB_REPLAY_LATENCY / 1000
+    )
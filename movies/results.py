@@ -0,0 +1,130 @@
+import hashlib
+import math
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.db.models import Q
+
+CURSOR_SALT = "movies.results.cursor"
+
+
+def _cache():
+    return caches[settings.TMDB_CACHE_ALIAS]
+
+
+def snapshot_key(*parts):
+    """Cache key for one materialized result list (a query, a user, ...)."""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f"results:{digest}"
+
+
+def load(key):
+    return _cache().get(key)
+
+
+def store(key, value):
+    _cache().set(key, value, settings.RESULT_SNAPSHOT_TTL)
+
+
+def encode_cursor(key, position):
+    return signing.dumps([key[-12:], position], salt=CURSOR_SALT)
+
+
+def decode_cursor(key, cursor):
+    """Return the position ``cursor`` points at, or None if it isn't for ``key``."""
+    try:
+        tag, position = signing.loads(cursor, salt=CURSOR_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    if tag != key[-12:]:
+        return None
+    return position
+
+
+def requested_offset(params, key, per_page):
+    """Return ``(offset, from_cursor)`` for a request's query parameters.
+
+    A ``?cursor=`` wins; a plain ``?page=`` (old links and bookmarks) is
+    still understood.
+    """
+    cursor = params.get("cursor")
+    if cursor:
+        offset = decode_cursor(key, cursor)
+        if isinstance(offset, int) and offset >= 0:
+            return offset, True
+    try:
+        page = max(int(params.get("page", 1)), 1)
+    except (TypeError, ValueError):
+        page = 1
+    return (page - 1) * per_page, False
+
+
+class CursorPage:
+    """One page sliced out of a materialized result list.
+
+    Exposes ``number``/``num_pages``/``has_previous``/``has_next`` like a
+    Django ``Page``, plus opaque cursors for the neighbouring pages.
+    ``has_more`` overrides whether a next page exists when the list is
+    still being filled lazily.
+    """
+
+    def __init__(self, key, items, offset, per_page, has_more=None):
+        if items and offset >= len(items) and has_more is None:
+            offset = (len(items) - 1) // per_page * per_page
+        end = offset + per_page
+        if has_more is None:
+            has_more = len(items) > end
+
+        self.object_list = items[offset:end]
+        self.number = offset // per_page + 1
+        self.num_pages = max(math.ceil(len(items) / per_page), 1)
+        self.previous_cursor = (
+            encode_cursor(key, max(offset - per_page, 0)) if offset > 0 else None
+        )
+        self.next_cursor = encode_cursor(key, end) if has_more else None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _keyset_filter(ordering, values):
+    """Q selecting the rows that come after ``values`` in ``ordering``."""
+    after = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        clause = Q(**{f"{name}__{lookup}": values[i]})
+        for prev, value in zip(ordering[:i], values[:i]):
+            clause &= Q(**{prev.lstrip("-"): value})
+        after |= clause
+    return after
+
+
+def keyset_page(queryset, ordering, per_page, cursor=None, scope="", evaluate=list):
+    """Return ``(rows, next_cursor)`` for one keyset-paginated page.
+
+    ``ordering`` lists the fields rows are sorted by, ending in a unique
+    one (e.g. ``["-added_at", "-id"]``). The cursor carries the last row's
+    values, so every page is an index range scan rather than an OFFSET.
+    ``scope`` ties cursors to one listing; ``evaluate`` turns the sliced
+    queryset into rows.
+    """
+    queryset = queryset.order_by(*ordering)
+    values = decode_cursor(scope, cursor) if cursor else None
+    if isinstance(values, list) and len(values) == len(ordering):
+        queryset = queryset.filter(_keyset_filter(ordering, values))
+
+    rows = evaluate(queryset[: per_page + 1])
+    if len(rows) <= per_page:
+        return rows, None
+
+    rows = rows[:per_page]
+    last = [getattr(rows[-1], field.lstrip("-")) for field in ordering]
+    last = [v.isoformat() if hasattr(v, "isoformat") else v for v in last]
+    return rows, encode_cursor(scope, last)
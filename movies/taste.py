@@ -0,0 +1,106 @@
+from collections import Counter
+from functools import partial
+
+from django.db import transaction
+
+from .models import Favorite, TasteProfile, Title
+from .titles import TITLE_APPEND, remember_many, resolve
+from .tmdb import fetch_many, get_client
+
+
+def title_features(title):
+    """Return ``(genres, keywords, people)`` Counters for one Title row."""
+    genres = Counter(str(gid) for gid in title.genres)
+    keywords = Counter(str(kid) for kid in title.keywords)
+    people = Counter(title.people)
+    return genres, keywords, people
+
+
+def _merge(stored, delta, sign):
+    counts = Counter(stored)
+    for key, weight in delta.items():
+        counts[key] += sign * weight
+    return {key: weight for key, weight in counts.items() if weight > 0}
+
+
+def apply_title(user, title, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) one title from the profile.
+
+    Users without a stored profile are left alone; ``get_profile`` builds
+    one from all of their favorites on the next read.
+    """
+    genres, keywords, people = title_features(title)
+    with transaction.atomic():
+        profile = TasteProfile.objects.select_for_update().filter(user=user).first()
+        if profile is None:
+            return None
+        profile.genres = _merge(profile.genres, genres, sign)
+        profile.keywords = _merge(profile.keywords, keywords, sign)
+        profile.people = _merge(profile.people, people, sign)
+        profile.save()
+    return profile
+
+
+def remove_title(user, media_type, tmdb_id):
+    title = resolve(media_type, tmdb_id)
+    if title:
+        apply_title(user, title, sign=-1)
+    else:
+        # Can't tell what to subtract; let the next read rebuild it.
+        TasteProfile.objects.filter(user=user).delete()
+
+
+def favorite_titles(user):
+    """Return Title rows for a user's favorites, fetching any we lack."""
+    keys = set(Favorite.objects.filter(user=user).values_list("media_type", "tmdb_id"))
+
+    def load(ids):
+        return {
+            (t.media_type, t.tmdb_id): t
+            for t in Title.objects.filter(tmdb_id__in=ids)
+            if (t.media_type, t.tmdb_id) in keys
+        }
+
+    titles = load({tmdb_id for _, tmdb_id in keys})
+    missing = [key for key in keys if key not in titles]
+    if missing:
+        tmdb = get_client()
+        calls = [
+            partial(tmdb.title, media_type, tmdb_id, parts=TITLE_APPEND)
+            for media_type, tmdb_id in missing
+        ]
+        remember_many(
+            (media_type, data)
+            for (media_type, _), data in zip(missing, fetch_many(calls))
+            if data
+        )
+        titles.update(load({tmdb_id for _, tmdb_id in missing}))
+
+    return list(titles.values())
+
+
+def rebuild_profile(user):
+    """Recompute a user's profile from scratch from their favorites."""
+    genres, keywords, people = Counter(), Counter(), Counter()
+    for title in favorite_titles(user):
+        g, k, p = title_features(title)
+        genres.update(g)
+        keywords.update(k)
+        people.update(p)
+
+    profile, _ = TasteProfile.objects.update_or_create(
+        user=user,
+        defaults={
+            "genres": dict(genres),
+            "keywords": dict(keywords),
+            "people": dict(people),
+        },
+    )
+    return profile
+
+
+def get_profile(user):
+    profile = TasteProfile.objects.filter(user=user).first()
+    if profile is None:
+        profile = rebuild_profile(user)
+    return profile
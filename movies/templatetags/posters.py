@@ -0,0 +1,19 @@
+from django import template
+
+from .. import posters
+
+register = template.Library()
+
+
+@register.filter
+def poster_src(url, size="w342"):
+    """``{{ item.poster|poster_src:"w185" }}``"""
+    return posters.poster_src(url, size)
+
+
+@register.filter
+def poster_srcset(url, sizes=None):
+    """``{{ item.poster|poster_srcset }}`` or ``|poster_srcset:"w342,w780"``"""
+    if sizes:
+        return posters.poster_srcset(url, sizes.split(","))
+    return posters.poster_srcset(url)
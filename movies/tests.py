@@ -1,3 +1,642 @@
-from django.test import TestCase
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .models import Favorite, Person, SuggestionSnapshot, TasteProfile, Title
+from .people import PersonIndex, best_candidate
+from .recommend import get_snapshot, mark_stale, save_snapshots
+from .refresh import Refresher
+from .replay import RECORD, Recordings
+from .results import keyset_page, snapshot_key
+from .taste import apply_title, rebuild_profile, remove_title
+from .titles import ais_fresh
+from .tmdb import CircuitBreaker, RateLimiter, TMDBClient, cache_key
+from .views import SAVED_ORDERINGS
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_threshold_failures(self):
+        breaker = CircuitBreaker(threshold=2, cooldown=60)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker(threshold=2, cooldown=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_lets_one_trial_through(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=0)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+    def test_trial_success_closes(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=0)
+        breaker.record_failure()
+        breaker.allow()
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_trial_failure_reopens(self):
+        breaker = CircuitBreaker(threshold=3, cooldown=60)
+        for _ in range(3):
+            breaker.record_failure()
+        breaker._opened_at -= 60
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_released_trial_can_be_retried(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.release_trial()
+        self.assertTrue(breaker.allow())
+
+
+class RateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        caches["tmdb"].clear()
+
+    def test_burst_then_refuses_without_wait(self):
+        limiter = RateLimiter(rate=10, burst=2)
+        self.assertTrue(limiter.acquire(0))
+        self.assertTrue(limiter.acquire(0))
+        self.assertFalse(limiter.acquire(0))
+
+    def test_waits_for_refill(self):
+        limiter = RateLimiter(rate=100, burst=1)
+        limiter.acquire(0)
+        self.assertTrue(limiter.acquire(0.1))
+
+    def test_zero_rate_is_unlimited(self):
+        limiter = RateLimiter(rate=0, burst=1)
+        self.assertTrue(all(limiter.acquire(0) for _ in range(50)))
+
+    @mock.patch("movies.tmdb.time.time", return_value=1000.5)
+    def test_global_cap_per_second(self, _time):
+        limiter = RateLimiter(rate=0, burst=1, global_rate=2)
+        self.assertTrue(limiter.acquire(0))
+        self.assertTrue(limiter.acquire(0))
+        self.assertFalse(limiter.acquire(0))
+
+
+@override_settings(TMDB_RATE_LIMIT_WAIT=0, TMDB_REPLAY_MODE="")
+class FetchGuardTests(SimpleTestCase):
+    def test_rate_limited_trial_does_not_wedge_breaker(self):
+        client = TMDBClient(api_key="test")
+        client.breaker = CircuitBreaker(threshold=1, cooldown=0)
+        client.limiter = RateLimiter(rate=0.001, burst=1)
+        client.limiter.acquire(0)
+        client.breaker.record_failure()
+
+        with mock.patch.object(client.session, "get") as get:
+            self.assertEqual(client._fetch("/movie/1", {}), (None, "skipped"))
+            get.assert_not_called()
+        self.assertEqual(client.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(client.breaker.allow())
+
+
+class BestCandidateTests(SimpleTestCase):
+    def test_prefers_closest_name(self):
+        candidates = [
+            {"id": 1, "name": "Maggie Gyllenhaal", "popularity": 50},
+            {"id": 2, "name": "Jake Gyllenhaal", "popularity": 40},
+        ]
+        self.assertEqual(best_candidate("jake gylenhaal", candidates)["id"], 2)
+
+    def test_exact_name_beats_longer_variant(self):
+        candidates = [
+            {"id": 1, "name": "Michael B. Jordan", "popularity": 90},
+            {"id": 2, "name": "Michael Jordan", "popularity": 10},
+        ]
+        self.assertEqual(best_candidate("Michael Jordan", candidates)["id"], 2)
+
+    def test_ties_go_to_more_popular(self):
+        candidates = [
+            {"id": 1, "name": "Chris Evans", "popularity": 5},
+            {"id": 2, "name": "Chris Evans", "popularity": 80},
+        ]
+        self.assertEqual(best_candidate("Chris Evans", candidates)["id"], 2)
+
+    def test_none_below_threshold(self):
+        candidates = [{"id": 1, "name": "Keanu Reeves"}, {"name": "No Id"}]
+        self.assertIsNone(best_candidate("Meryl Streep", candidates))
+        self.assertIsNone(best_candidate("Meryl Streep", []))
+
+
+@override_settings(PERSON_INDEX_REFRESH=3600)
+class PersonIndexTests(TestCase):
+    def test_only_the_chosen_person_is_stored(self):
+        index = PersonIndex()
+        index.learn({"id": 1, "name": "Maggie Gyllenhaal"}, "Maggie Gyllenhaal")
+        self.assertEqual(list(Person.objects.values_list("tmdb_id", flat=True)), [1])
+        self.assertEqual(index.lookup("maggie gyllenhaal"), (1, "Maggie Gyllenhaal"))
+
+    def test_similar_names_are_not_matched_locally(self):
+        index = PersonIndex()
+        index.learn({"id": 1, "name": "Maggie Gyllenhaal"}, "Maggie Gyllenhaal")
+        index.learn({"id": 2, "name": "Michael B. Jordan"}, "Michael B Jordan")
+        self.assertIsNone(index.lookup("Jake Gyllenhaal"))
+        self.assertIsNone(index.lookup("Michael Jordan"))
+
+    def test_resolved_query_becomes_alias(self):
+        index = PersonIndex()
+        index.lookup("anything")
+        index.learn({"id": 3, "name": "Scarlett Johansson"}, "scarlet johanson")
+        self.assertEqual(index.lookup("Scarlet Johanson"), (3, "Scarlett Johansson"))
+        self.assertEqual(PersonIndex().lookup("scarlet johanson")[0], 3)
+
+
+class ActorSearchTests(TestCase):
+    def search(self, results):
+        tmdb = mock.Mock()
+        tmdb.search_person = mock.AsyncMock(return_value={"results": results})
+        with mock.patch("movies.views.get_async_client", return_value=tmdb):
+            return self.client.get("/", {"q": "Jon Smith", "type": "actor"})
+
+    def test_matched_person_is_learned(self):
+        response = self.search([{"id": 1, "name": "John Smith", "popularity": 3}])
+        self.assertRedirects(
+            response, "/actor/1/John%20Smith/", fetch_redirect_response=False
+        )
+        self.assertEqual(Person.objects.get().aliases, ["Jon Smith"])
+
+    def test_fallback_to_top_result_is_not_learned(self):
+        response = self.search([{"id": 2, "name": "Xavier Quill"}])
+        self.assertRedirects(
+            response, "/actor/2/Xavier%20Quill/", fetch_redirect_response=False
+        )
+        self.assertFalse(Person.objects.exists())
+
+
+class ConditionalPageTests(TestCase):
+    def get(self, **headers):
+        tmdb = mock.Mock()
+        tmdb.upcoming_movies = mock.AsyncMock(
+            return_value={"results": [{"id": 1, "title": "One"}]}
+        )
+        tmdb.on_the_air_tv = mock.AsyncMock(return_value={"results": []})
+        with mock.patch("movies.views.get_async_client", return_value=tmdb), mock.patch(
+            "movies.views._personalized_for", mock.AsyncMock(return_value=[])
+        ):
+            return self.client.get("/upcoming/", headers=headers)
+
+    def test_matching_etag_gets_304(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("public", first["Cache-Control"])
+        self.assertNotIn("Last-Modified", first)
+
+        second = self.get(if_none_match=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_logged_in_page_is_private(self):
+        self.client.force_login(User.objects.create(username="viewer"))
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertNotIn("public", response["Cache-Control"])
+
+    def test_page_with_pending_messages_is_private(self):
+        self.client.cookies["messages"] = "pending"
+        response = self.get()
+        self.assertNotIn("ETag", response)
+        self.assertIn("private", response["Cache-Control"])
+
+
+class MetricsEndpointTests(SimpleTestCase):
+    @override_settings(METRICS_TOKEN="", DEBUG=False)
+    def test_refused_without_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+    @override_settings(METRICS_TOKEN="", DEBUG=True)
+    def test_open_under_debug(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_requires_bearer_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        response = self.client.get(
+            "/metrics", headers={"authorization": "Bearer secret"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class TitleFreshnessTests(TestCase):
+    async def test_fresh_until_details_ttl_passes(self):
+        self.assertFalse(await ais_fresh("movie", 7))
+        await Title.objects.acreate(tmdb_id=7, media_type="movie", title="Seven")
+        self.assertTrue(await ais_fresh("movie", 7))
+        self.assertFalse(await ais_fresh("tv", 7))
+
+        with override_settings(TMDB_CACHE_TTLS={"details": 60}):
+            await Title.objects.filter(tmdb_id=7).aupdate(
+                fetched_at=timezone.now() - timedelta(minutes=2)
+            )
+            self.assertFalse(await ais_fresh("movie", 7))
+
+
+class RecordingsTests(SimpleTestCase):
+    details = {
+        "id": 1,
+        "title": "One",
+        "credits": {"cast": [{"id": 9, "name": "Nine"}]},
+        "keywords": {"keywords": []},
+        "videos": {"results": []},
+    }
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.recordings = Recordings(self.dir, RECORD, cache_key)
+        self.recordings.save(
+            "/movie/1", {"append_to_response": "credits,keywords,videos"}, self.details
+        )
+        caches["tmdb"].clear()
+
+    def test_parts_replay_in_any_combination(self):
+        data = self.recordings.load(
+            "/movie/1", {"append_to_response": "keywords,credits"}
+        )
+        self.assertEqual(data["credits"], self.details["credits"])
+        self.assertNotIn("videos", data)
+        self.assertEqual(self.recordings.load("/movie/1/videos", {}), {"results": []})
+        self.assertEqual(
+            self.recordings.load("/movie/1", {}), {"id": 1, "title": "One"}
+        )
+
+    def test_unrecorded_request_misses(self):
+        self.assertIsNone(self.recordings.load("/movie/2", {}))
+        data = self.recordings.load("/movie/1", {"append_to_response": "similar"})
+        self.assertNotIn("similar", data)
+
+    def test_client_replays_whatever_parts_are_missing(self):
+        with override_settings(TMDB_REPLAY_MODE="replay", TMDB_REPLAY_DIR=self.dir):
+            client = TMDBClient(api_key="")
+            with mock.patch.object(client.session, "get") as get:
+                first = client.title("movie", 1, parts=("credits", "keywords"))
+                second = client.title("movie", 1, parts=("credits", "videos"))
+                get.assert_not_called()
+        self.assertEqual(first["credits"], self.details["credits"])
+        self.assertEqual(second["videos"], self.details["videos"])
+
+
+@override_settings(TMDB_REPLAY_MODE="")
+class TitlePlannerTests(SimpleTestCase):
+    def setUp(self):
+        caches["tmdb"].clear()
+        self.client = TMDBClient(api_key="test")
+
+    def test_fetches_only_missing_parts(self):
+        self.client._store(cache_key("/movie/1", {}), "details", {"id": 1})
+        with mock.patch.object(
+            self.client, "fetch", return_value={"id": 1, "videos": {"results": []}}
+        ) as fetch:
+            data = self.client.title("movie", 1, parts=("videos",))
+        fetch.assert_called_once_with("/movie/1", append_to_response="videos")
+        self.assertEqual(data["videos"], {"results": []})
+
+        with mock.patch.object(self.client, "fetch") as fetch:
+            self.client.title("movie", 1, parts=("videos",))
+        fetch.assert_not_called()
+
+    def test_fresh_fetch_replaces_stale_base(self):
+        stale = ({"id": 1, "title": "Old"}, time.time() - 1)
+        caches["tmdb"].set(cache_key("/movie/1", {}), stale, 60)
+        fresh = {"id": 1, "title": "New", "credits": {"cast": []}}
+        with mock.patch.object(self.client, "fetch", return_value=fresh), mock.patch(
+            "movies.tmdb._background.submit"
+        ) as submit:
+            data = self.client.title("movie", 1, parts=("credits",))
+        self.assertEqual(data["title"], "New")
+        submit.assert_not_called()
+
+
+class TasteProfileTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="taste")
+        self.titles = [
+            Title.objects.create(
+                tmdb_id=1,
+                media_type="movie",
+                title="One",
+                genres=[28, 12],
+                keywords=[5],
+                people={"10": 1, "11": 2},
+            ),
+            Title.objects.create(
+                tmdb_id=2,
+                media_type="tv",
+                title="Two",
+                genres=[28],
+                keywords=[5, 6],
+                people={"10": 2},
+            ),
+            Title.objects.create(
+                tmdb_id=3,
+                media_type="movie",
+                title="Three",
+                genres=[18],
+                keywords=[],
+                people={"12": 1},
+            ),
+        ]
+
+    def favorite(self, title):
+        Favorite.objects.create(
+            user=self.user,
+            tmdb_id=title.tmdb_id,
+            media_type=title.media_type,
+            title=title.title,
+        )
+
+    def counts(self, profile):
+        return profile.genres, profile.keywords, profile.people
+
+    def assertMatchesRebuild(self):
+        incremental = self.counts(TasteProfile.objects.get(user=self.user))
+        self.assertEqual(incremental, self.counts(rebuild_profile(self.user)))
+
+    def test_incremental_updates_match_rebuild(self):
+        one, two, three = self.titles
+        self.favorite(one)
+        rebuild_profile(self.user)
+
+        for title in (two, three):
+            self.favorite(title)
+            apply_title(self.user, title)
+            self.assertMatchesRebuild()
+
+        Favorite.objects.filter(user=self.user, tmdb_id=two.tmdb_id).delete()
+        remove_title(self.user, two.media_type, two.tmdb_id)
+        self.assertMatchesRebuild()
+
+        Favorite.objects.filter(user=self.user).delete()
+        remove_title(self.user, one.media_type, one.tmdb_id)
+        remove_title(self.user, three.media_type, three.tmdb_id)
+        self.assertEqual(
+            self.counts(TasteProfile.objects.get(user=self.user)), ({}, {}, {})
+        )
+
+    def test_users_without_profile_are_left_alone(self):
+        self.assertIsNone(apply_title(self.user, self.titles[0]))
+        self.assertFalse(TasteProfile.objects.filter(user=self.user).exists())
+
+
+@override_settings(TMDB_REPLAY_MODE="")
+class PrefetchTests(SimpleTestCase):
+    def setUp(self):
+        caches["tmdb"].clear()
+        self.client = TMDBClient(api_key="test")
+
+    @mock.patch("movies.tmdb._background.submit")
+    def test_queued_once_per_key(self, submit):
+        self.client.search_multi("alien", page=2, prefetch=True)
+        self.client.search_multi("alien", page=2, prefetch=True)
+        self.assertEqual(submit.call_count, 1)
+
+        self.client.search_multi("alien", page=3, prefetch=True)
+        self.assertEqual(submit.call_count, 2)
+
+    @mock.patch("movies.tmdb._background.submit")
+    def test_skipped_when_cached(self, submit):
+        params = {"query": "alien", "include_adult": "false", "page": 2}
+        self.client._store(cache_key("/search/multi", params), "search", {})
+        self.client.search_multi("alien", page=2, prefetch=True)
+        submit.assert_not_called()
+
+    def test_loads_into_cache(self):
+        with mock.patch.object(self.client, "fetch", return_value={"results": []}):
+            with mock.patch("movies.tmdb._background.submit") as submit:
+                self.client.search_multi("alien", page=2, prefetch=True)
+            load = submit.call_args.args[0]
+            load()
+        with mock.patch.object(self.client, "fetch") as fetch:
+            self.assertEqual(self.client.search_multi("alien", page=2), {"results": []})
+        fetch.assert_not_called()
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="snap")
+        self.built = timezone.now() - timedelta(minutes=5)
+        self.snapshot = SuggestionSnapshot.objects.create(
+            user=self.user,
+            personalized=[{"media_type": "movie", "id": 1}],
+            items=[{"media_type": "movie", "id": 1}, {"media_type": "tv", "id": 2}],
+            generated_at=self.built,
+        )
+
+    def rebuilt(self, generated_at):
+        return SuggestionSnapshot(
+            user=self.user,
+            personalized=[],
+            items=[{"media_type": "movie", "id": 9}],
+            generated_at=generated_at,
+        )
+
+    def test_stale_snapshot_is_served_without_new_favorites(self):
+        Favorite.objects.create(user=self.user, tmdb_id=1, media_type="movie")
+        mark_stale(self.user)
+        with mock.patch("movies.recommend.rebuild_later") as rebuild_later:
+            snapshot = get_snapshot(self.user)
+        rebuild_later.assert_called_once_with(self.user)
+        self.assertEqual(snapshot.personalized, [])
+        self.assertEqual(snapshot.items, [{"media_type": "tv", "id": 2}])
+
+    def test_fresh_snapshot_is_not_rebuilt(self):
+        with mock.patch("movies.recommend.rebuild_later") as rebuild_later:
+            get_snapshot(self.user)
+        rebuild_later.assert_not_called()
+
+    def test_build_started_before_favorites_changed_is_not_saved(self):
+        started = timezone.now()
+        mark_stale(self.user)
+        self.assertEqual(save_snapshots([self.rebuilt(started)]), 0)
+        self.snapshot.refresh_from_db()
+        self.assertEqual(self.snapshot.generated_at, self.built)
+        self.assertTrue(self.snapshot.is_stale)
+
+    def test_build_started_after_favorites_changed_is_saved(self):
+        mark_stale(self.user)
+        self.assertEqual(save_snapshots([self.rebuilt(timezone.now())]), 1)
+        self.snapshot.refresh_from_db()
+        self.assertEqual(self.snapshot.items, [{"media_type": "movie", "id": 9}])
+        self.assertFalse(self.snapshot.is_stale)
+
+    def test_older_build_does_not_replace_newer_snapshot(self):
+        older = self.rebuilt(self.built - timedelta(minutes=1))
+        self.assertEqual(save_snapshots([older]), 0)
+
+
+class RefresherTests(SimpleTestCase):
+    def setUp(self):
+        self.ttl = 60
+        self.build = mock.Mock(return_value=None, __qualname__="build")
+        self.refresher = Refresher(self.build, lambda: self.ttl)
+        patcher = mock.patch("movies.refresh._rebuilder")
+        self.rebuilder = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_first_use_builds_inline_once(self):
+        self.refresher.ensure()
+        self.refresher.ensure()
+        self.build.assert_called_once()
+        self.assertTrue(self.refresher.built)
+        self.rebuilder.submit.assert_not_called()
+
+    def test_expired_state_is_rebuilt_once_in_the_background(self):
+        self.refresher.ensure()
+        self.ttl = -1
+        self.refresher.ensure()
+        self.refresher.ensure()
+        self.assertEqual(self.build.call_count, 1)
+        self.rebuilder.submit.assert_called_once()
+
+        func, done = self.rebuilder.submit.call_args.args
+        func(done)
+        self.assertEqual(self.build.call_count, 2)
+        self.refresher.ensure()
+        self.assertEqual(self.rebuilder.submit.call_count, 2)
+
+    def test_failed_build_is_retried(self):
+        self.build.return_value = False
+        self.refresher.ensure()
+        self.assertFalse(self.refresher.built)
+        self.refresher.ensure()
+        self.assertEqual(self.build.call_count, 2)
+
+    def test_first_callers_wait_for_a_scheduled_build(self):
+        self.refresher.schedule()
+        func, done = self.rebuilder.submit.call_args.args
+        waiter = threading.Thread(target=self.refresher.ensure)
+        waiter.start()
+        func(done)
+        waiter.join(timeout=5)
+        self.assertFalse(waiter.is_alive())
+        self.build.assert_called_once()
+
+
+class KeysetPageTests(TestCase):
+    per_page = 3
+
+    def setUp(self):
+        self.user = User.objects.create(username="pages")
+        base = timezone.now()
+        # Eight favorites over four timestamps, so every page boundary
+        # falls inside a run of equal added_at values at some sort.
+        for i in range(8):
+            favorite = Favorite.objects.create(
+                user=self.user,
+                tmdb_id=i,
+                media_type="movie" if i % 3 else "tv",
+                title=str(i),
+            )
+            Favorite.objects.filter(pk=favorite.pk).update(
+                added_at=base - timedelta(minutes=i // 2)
+            )
+        self.favorites = Favorite.objects.filter(user=self.user)
+
+    def scope(self, sort, media="all"):
+        return snapshot_key("Favorite", self.user.pk, sort, media)
+
+    def walk(self, sort, queryset=None):
+        queryset = self.favorites if queryset is None else queryset
+        seen, cursor = [], None
+        for _ in range(10):
+            rows, cursor = keyset_page(
+                queryset,
+                SAVED_ORDERINGS[sort],
+                self.per_page,
+                cursor=cursor,
+                scope=self.scope(sort),
+            )
+            self.assertLessEqual(len(rows), self.per_page)
+            seen += [row.pk for row in rows]
+            if cursor is None:
+                return seen
+        self.fail("paging did not finish")
+
+    def test_pages_cover_every_row_once_for_each_ordering(self):
+        for sort, ordering in SAVED_ORDERINGS.items():
+            with self.subTest(sort=sort):
+                expected = list(
+                    self.favorites.order_by(*ordering).values_list("pk", flat=True)
+                )
+                self.assertEqual(self.walk(sort), expected)
+
+    def test_ties_on_added_at_split_across_pages(self):
+        self.favorites.update(added_at=timezone.now())
+        for sort, ordering in SAVED_ORDERINGS.items():
+            with self.subTest(sort=sort):
+                expected = list(
+                    self.favorites.order_by(*ordering).values_list("pk", flat=True)
+                )
+                self.assertEqual(self.walk(sort), expected)
+
+    def test_exact_page_multiple_has_no_empty_last_page(self):
+        queryset = self.favorites.filter(tmdb_id__lt=6)
+        _, cursor = keyset_page(
+            queryset, SAVED_ORDERINGS["newest"], 3, scope=self.scope("newest")
+        )
+        rows, cursor = keyset_page(
+            queryset,
+            SAVED_ORDERINGS["newest"],
+            3,
+            cursor=cursor,
+            scope=self.scope("newest"),
+        )
+        self.assertEqual(len(rows), 3)
+        self.assertIsNone(cursor)
+
+    def test_cursor_from_another_listing_starts_over(self):
+        first, cursor = keyset_page(
+            self.favorites,
+            SAVED_ORDERINGS["newest"],
+            self.per_page,
+            scope=self.scope("newest"),
+        )
+        for sort, media in (("oldest", "all"), ("type", "all"), ("newest", "tv")):
+            with self.subTest(sort=sort, media=media):
+                ordering = SAVED_ORDERINGS[sort]
+                rows, _ = keyset_page(
+                    self.favorites,
+                    ordering,
+                    self.per_page,
+                    cursor=cursor,
+                    scope=self.scope(sort, media),
+                )
+                expected = list(self.favorites.order_by(*ordering)[: self.per_page])
+                self.assertEqual(rows, expected)
+
+    def test_tampered_cursor_starts_over(self):
+        rows, _ = keyset_page(
+            self.favorites,
+            SAVED_ORDERINGS["newest"],
+            self.per_page,
+            cursor="not-a-cursor",
+            scope=self.scope("newest"),
+        )
+        self.assertEqual(
+            rows, list(self.favorites.order_by("-added_at", "-id")[: self.per_page])
+        )
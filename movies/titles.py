@@ -0,0 +1,116 @@
+from collections import Counter
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Title
+from .tmdb import DETAILS, get_client
+
+# Sub-resources a details payload needs for a complete Title row.
+TITLE_APPEND = ("credits", "keywords")
+
+UPSERT_FIELDS = [
+    "title",
+    "poster_path",
+    "release_date",
+    "genres",
+    "keywords",
+    "people",
+    "runtime",
+    "fetched_at",
+]
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def build_title(media_type, data):
+    """Return an unsaved Title for a TMDB details payload."""
+    kw = data.get("keywords", {}).get("keywords") or data.get("keywords", [])
+    if isinstance(kw, dict):
+        # TV titles nest their keywords under "results".
+        kw = kw.get("results", [])
+
+    people = Counter()
+    credits = data.get("credits", {})
+    for actor in credits.get("cast", [])[:5]:
+        people[str(actor["id"])] += 1
+    for crew_member in credits.get("crew", []):
+        if crew_member.get("job") in ["Director", "Writer", "Creator"]:
+            people[str(crew_member["id"])] += 2
+
+    runtime = data.get("runtime")
+    if runtime is None and data.get("episode_run_time"):
+        runtime = data["episode_run_time"][0]
+
+    return Title(
+        tmdb_id=data["id"],
+        media_type=media_type,
+        title=(data.get("title") or data.get("name") or "")[:255],
+        poster_path=data.get("poster_path"),
+        release_date=_parse_date(
+            data.get("release_date") or data.get("first_air_date")
+        ),
+        genres=[g["id"] for g in data.get("genres", [])],
+        keywords=[k["id"] for k in kw],
+        people=dict(people),
+        runtime=runtime,
+    )
+
+
+def _upsert_kwargs():
+    return {
+        "update_conflicts": True,
+        "unique_fields": ["tmdb_id", "media_type"],
+        "update_fields": UPSERT_FIELDS,
+    }
+
+
+def remember(media_type, data):
+    Title.objects.bulk_create([build_title(media_type, data)], **_upsert_kwargs())
+
+
+async def aremember(media_type, data):
+    await Title.objects.abulk_create(
+        [build_title(media_type, data)], **_upsert_kwargs()
+    )
+
+
+async def ais_fresh(media_type, tmdb_id):
+    """Whether the stored Title is younger than the details cache TTL.
+
+    Views that show a cached details payload use this to skip re-upserting
+    a row that payload can't have changed.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.TMDB_CACHE_TTLS[DETAILS])
+    return await Title.objects.filter(
+        tmdb_id=tmdb_id, media_type=media_type, fetched_at__gte=cutoff
+    ).aexists()
+
+
+def remember_many(pairs):
+    """Upsert ``(media_type, data)`` pairs in one query."""
+    rows = {}
+    for media_type, data in pairs:
+        row = build_title(media_type, data)
+        rows[(row.media_type, row.tmdb_id)] = row
+    if rows:
+        Title.objects.bulk_create(list(rows.values()), **_upsert_kwargs())
+
+
+def resolve(media_type, tmdb_id):
+    """Return the local Title, fetching and storing it from TMDB if missing."""
+    title = Title.objects.filter(tmdb_id=tmdb_id, media_type=media_type).first()
+    if title is not None:
+        return title
+
+    data = get_client().title(media_type, tmdb_id, parts=TITLE_APPEND)
+    if not data:
+        return None
+    remember(media_type, data)
+    return Title.objects.filter(tmdb_id=tmdb_id, media_type=media_type).first()
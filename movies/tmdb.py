@@ -0,0 +1,601 @@
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextvars import copy_context
+from urllib.parse import urlencode
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import metrics, replay
+
+logger = logging.getLogger(__name__)
+
+IMAGE_ROOT = "https://image.tmdb.org/t/p"
+IMAGE_BASE = f"{IMAGE_ROOT}/w500"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# TTL classes, resolved against settings.TMDB_CACHE_TTLS at lookup time.
+STATIC = "static"
+LISTS = "lists"
+DETAILS = "details"
+SEARCH = "search"
+
+
+def cache_key(path, params):
+    """Build a cache key for a TMDB GET, independent of ``api_key``."""
+    query = urlencode(sorted((k, v) for k, v in params.items() if k != "api_key"))
+    digest = hashlib.sha1(f"{path}?{query}".encode()).hexdigest()
+    return f"tmdb:{digest}"
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key onto one execution.
+
+    The first caller runs ``func``; callers arriving while it is in flight
+    block until it finishes and receive the same result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            return call.result
+
+        try:
+            call.result = func()
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class RateLimiter:
+    """Token bucket for this worker, plus an optional shared per-second cap.
+
+    The shared cap counts requests in one-second windows in the ``tmdb``
+    cache, so it spans workers only when that cache is shared.
+    """
+
+    def __init__(self, rate, burst, global_rate=0):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.global_rate = global_rate
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def _take_local(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def _take_global(self):
+        window = int(time.time())
+        key = f"tmdb:rate:{window}"
+        cache = caches[settings.TMDB_CACHE_ALIAS]
+        cache.add(key, 0, 2)
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            return 0
+        if count <= self.global_rate:
+            return 0
+        return window + 1 - time.time()
+
+    def acquire(self, max_wait):
+        """Take a token, waiting at most ``max_wait`` seconds; False if not."""
+        deadline = time.monotonic() + max_wait
+        steps = []
+        if self.rate:
+            steps.append(self._take_local)
+        if self.global_rate:
+            steps.append(self._take_global)
+        for take in steps:
+            while True:
+                delay = take()
+                if not delay:
+                    break
+                if time.monotonic() + delay > deadline:
+                    return False
+                time.sleep(delay)
+        return True
+
+
+class CircuitBreaker:
+    """Stop calling TMDB after repeated failures, then probe after a cooldown.
+
+    Closed: requests flow. After ``threshold`` consecutive failures it opens
+    and rejects requests for ``cooldown`` seconds, then lets a single trial
+    request through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at < self.cooldown:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def release_trial(self):
+        """Give back an allowed call that never reached TMDB.
+
+        Without this a half-open circuit whose trial was dropped (e.g. by
+        the rate limiter) would wait forever for an outcome.
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.threshold:
+                if self._opened_at is None:
+                    logger.warning(
+                        "TMDB circuit opened after %s failures", self._failures
+                    )
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class TMDBClient:
+    """Thin wrapper around a pooled ``requests.Session`` for the TMDB v3 API.
+
+    Every endpoint method returns the decoded JSON payload, or ``None`` when
+    TMDB could not be reached or answered with a non-200 status, so views
+    only need a truthiness check. Successful responses are stored in the
+    ``tmdb`` cache alias for the TTL of the endpoint's class; failures are
+    never cached.
+
+    Once an entry's TTL has passed it is still served for up to
+    ``settings.TMDB_CACHE_MAX_STALE`` seconds while a background refresh
+    replaces it, so a slow or failing TMDB doesn't block the page.
+
+    Outgoing requests pass a rate limiter and a circuit breaker; when either
+    refuses, the call returns ``None`` straight away, so views fall back to
+    cached or empty sections instead of waiting on TMDB.
+
+    With ``TMDB_REPLAY_MODE`` set, responses are recorded to or replayed
+    from disk (see ``movies.replay``); replaying needs no network or key.
+    """
+
+    def __init__(self, api_key=None, base_url=None):
+        self.api_key = api_key if api_key is not None else settings.TMDB_API_KEY
+        self.base_url = (base_url or settings.TMDB_BASE_URL).rstrip("/")
+        self.timeout = (settings.TMDB_CONNECT_TIMEOUT, settings.TMDB_READ_TIMEOUT)
+
+        retry = Retry(
+            total=settings.TMDB_MAX_RETRIES,
+            backoff_factor=settings.TMDB_RETRY_BACKOFF,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET"]),
+            # TMDB can ask for long waits; keep worker latency bounded instead.
+            respect_retry_after_header=False,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.TMDB_POOL_SIZE,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._refreshing = set()
+        self._refreshing_lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.limiter = RateLimiter(
+            rate=settings.TMDB_RATE_LIMIT,
+            burst=settings.TMDB_RATE_BURST,
+            global_rate=settings.TMDB_GLOBAL_RATE_LIMIT,
+        )
+        self.breaker = CircuitBreaker(
+            threshold=settings.TMDB_BREAKER_FAILURES,
+            cooldown=settings.TMDB_BREAKER_COOLDOWN,
+        )
+        self.recordings = replay.from_settings(cache_key)
+
+    @property
+    def cache(self):
+        return caches[settings.TMDB_CACHE_ALIAS]
+
+    def get(self, path, cache=None, **params):
+        if cache is None:
+            return self.fetch(path, **params)
+
+        key = cache_key(path, params)
+        entry = self.cache.get(key)
+        if entry is not None:
+            data, fresh_until = entry
+            if time.time() < fresh_until:
+                metrics.record_cache(cache, "hit")
+            else:
+                metrics.record_cache(cache, "stale")
+                self._revalidate(key, cache, path, params)
+            return data
+        metrics.record_cache(cache, "miss")
+
+        return self._flight.do(key, lambda: self._load(key, cache, path, params))
+
+    def _load(self, key, cache, path, params):
+        """Fetch and cache a missing entry.
+
+        With ``TMDB_SINGLE_FLIGHT_SHARED`` a short-lived cache lock also
+        coalesces the fetch across workers: losers poll the cache for the
+        winner's result and only fetch themselves if it doesn't show up.
+        """
+        lock_key = None
+        if settings.TMDB_SINGLE_FLIGHT_SHARED:
+            wait_for = settings.TMDB_SINGLE_FLIGHT_WAIT
+            if self.cache.add(f"{key}:lock", 1, wait_for):
+                lock_key = f"{key}:lock"
+            else:
+                deadline = time.monotonic() + wait_for
+                while time.monotonic() < deadline:
+                    time.sleep(0.05)
+                    entry = self.cache.get(key)
+                    if entry is not None:
+                        return entry[0]
+
+        try:
+            data = self.fetch(path, **params)
+            if data is not None:
+                self._store(key, cache, data)
+            return data
+        finally:
+            if lock_key:
+                self.cache.delete(lock_key)
+
+    def _store(self, key, cache, data):
+        ttl = settings.TMDB_CACHE_TTLS[cache]
+        max_stale = settings.TMDB_CACHE_MAX_STALE.get(cache, 0)
+        self.cache.set(key, (data, time.time() + ttl), ttl + max_stale)
+
+    def _revalidate(self, key, cache, path, params):
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                data = self.fetch(path, **params)
+                # On failure the stale entry stays until its hard expiry.
+                if data is not None:
+                    self._store(key, cache, data)
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(key)
+
+        _background.submit(refresh)
+
+    def _prefetch(self, path, cache, params):
+        """Load an entry into the cache in the background.
+
+        Skipped when it is already cached or being loaded, so repeated
+        requests can't pile work onto the background pool.
+        """
+        key = cache_key(path, params)
+        if key in self._flight or self.cache.get(key) is not None:
+            return
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def load():
+            try:
+                self.get(path, cache=cache, **params)
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(key)
+
+        _background.submit(load)
+
+    def fetch(self, path, **params):
+        started = time.perf_counter()
+        data, outcome = self._fetch(path, params)
+        metrics.record_tmdb(path, time.perf_counter() - started, outcome)
+        return data
+
+    def _fetch(self, path, params):
+        """Return ``(data, outcome)``; outcome is "ok", "error" or "skipped"."""
+        if self.recordings is not None and self.recordings.replaying:
+            data = self.recordings.load(path, params)
+            return data, "ok" if data is not None else "error"
+
+        if not self.breaker.allow():
+            logger.debug("TMDB circuit open, skipping %s", path)
+            return None, "skipped"
+        if not self.limiter.acquire(settings.TMDB_RATE_LIMIT_WAIT):
+            self.breaker.release_trial()
+            logger.info("TMDB rate limit reached, skipping %s", path)
+            return None, "skipped"
+
+        query = {"api_key": self.api_key, **params}
+        try:
+            res = self.session.get(
+                f"{self.base_url}{path}", params=query, timeout=self.timeout
+            )
+        except requests.RequestException as exc:
+            self.breaker.record_failure()
+            logger.warning("TMDB request to %s failed: %s", path, exc)
+            return None, "error"
+
+        if res.status_code in RETRY_STATUSES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        if res.status_code != 200:
+            logger.info("TMDB request to %s returned %s", path, res.status_code)
+            return None, "error"
+        try:
+            data = res.json()
+        except ValueError:
+            logger.warning("TMDB request to %s returned invalid JSON", path)
+            return None, "error"
+        if self.recordings is not None:
+            self.recordings.save(path, params, data)
+        return data, "ok"
+
+    def trending_movies(self):
+        return self.get("/trending/movie/week", cache=LISTS)
+
+    def popular_tv(self):
+        return self.get("/tv/popular", cache=LISTS)
+
+    def upcoming_movies(self):
+        return self.get("/movie/upcoming", cache=LISTS)
+
+    def on_the_air_tv(self):
+        return self.get("/tv/on_the_air", cache=LISTS)
+
+    def search_multi(self, query, page=1, prefetch=False):
+        """Return one page of results, or with ``prefetch`` only warm the cache."""
+        params = {"query": query, "include_adult": "false", "page": page}
+        if prefetch:
+            return self._prefetch("/search/multi", SEARCH, params)
+        return self.get("/search/multi", cache=SEARCH, **params)
+
+    def search_person(self, query, page=1):
+        return self.get(
+            "/search/person",
+            cache=SEARCH,
+            query=query,
+            include_adult="false",
+            page=page,
+        )
+
+    def genre_list(self, media_type="movie", language="en-US"):
+        return self.get(f"/genre/{media_type}/list", cache=STATIC, language=language)
+
+    def discover(self, media_type, **params):
+        return self.get(f"/discover/{media_type}", cache=SEARCH, **params)
+
+    def title(self, media_type, item_id, parts=()):
+        """Return a title's details with ``parts`` appended, in one round trip.
+
+        The base payload and every sub-resource (``credits``,
+        ``watch/providers``, ...) are cached under their own keys, the same
+        ones a standalone request for that resource uses, so views asking
+        for different parts of a title share them. Only parts that aren't
+        cached are fetched, merged into a single ``append_to_response``.
+        """
+        path = f"/{media_type}/{item_id}"
+        keys = {None: cache_key(path, {})}
+        keys.update((part, cache_key(f"{path}/{part}", {})) for part in parts)
+        entries = self.cache.get_many(list(keys.values()))
+
+        found, missing, stale = {}, [], []
+        now = time.time()
+        for part, key in keys.items():
+            entry = entries.get(key)
+            if entry is None:
+                metrics.record_cache(DETAILS, "miss")
+                missing.append(part)
+                continue
+            found[part], fresh_until = entry
+            if now < fresh_until:
+                metrics.record_cache(DETAILS, "hit")
+            else:
+                metrics.record_cache(DETAILS, "stale")
+                stale.append(part)
+
+        if missing:
+            # The base payload comes back with any details call.
+            wanted = [part for part in missing if part is not None]
+            flight_key = cache_key(path, {"append_to_response": ",".join(wanted)})
+            data = self._flight.do(flight_key, lambda: self._load_parts(path, wanted))
+            if data is not None:
+                # The fetch also brought a fresh base; don't refresh it again.
+                found[None] = data
+                stale = [part for part in stale if part is not None]
+                for part in wanted:
+                    if part in data:
+                        found[part] = data[part]
+        if stale:
+            self._revalidate_parts(path, [part for part in stale if part])
+
+        base = found.get(None)
+        if base is None:
+            return None
+        merged = dict(base)
+        for part in parts:
+            if part in found:
+                merged[part] = found[part]
+        return merged
+
+    def _load_parts(self, path, parts):
+        params = {"append_to_response": ",".join(parts)} if parts else {}
+        data = self.fetch(path, **params)
+        if data is None:
+            return None
+        base = {k: v for k, v in data.items() if k not in parts}
+        self._store(cache_key(path, {}), DETAILS, base)
+        for part in parts:
+            if part in data:
+                self._store(cache_key(f"{path}/{part}", {}), DETAILS, data[part])
+        return data
+
+    def _revalidate_parts(self, path, parts):
+        key = cache_key(path, {"append_to_response": ",".join(parts)})
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._load_parts(path, parts)
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(key)
+
+        _background.submit(refresh)
+
+    def recommendations(self, media_type, item_id, page=1):
+        return self.get(
+            f"/{media_type}/{item_id}/recommendations", cache=DETAILS, page=page
+        )
+
+    def person_combined_credits(self, person_id):
+        return self.get(f"/person/{person_id}/combined_credits", cache=DETAILS)
+
+
+class AsyncTMDBClient:
+    """Awaitable facade over a ``TMDBClient``.
+
+    Each endpoint call runs on a worker thread so async views can
+    ``asyncio.gather`` independent requests while still sharing the pooled
+    session, retries and response cache of the synchronous client.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        return sync_to_async(getattr(self._client, name), thread_sensitive=False)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide client, creating it on first use.
+
+    Creation is lazy so that each gunicorn worker builds its own connection
+    pool after forking.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = TMDBClient()
+    return _client
+
+
+def get_async_client():
+    return AsyncTMDBClient(get_client())
+
+
+_background = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tmdb-prefetch")
+
+
+def fetch_many(calls, max_workers=None, deadline=None):
+    """Run independent zero-argument TMDB calls concurrently.
+
+    Results come back in the order of ``calls``. A call that raises or is
+    still running when ``deadline`` seconds have passed yields ``None``.
+    """
+    calls = list(calls)
+    if not calls:
+        return []
+    max_workers = max_workers or settings.TMDB_FANOUT_WORKERS
+    deadline = deadline if deadline is not None else settings.TMDB_FANOUT_DEADLINE
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(calls)))
+    try:
+        # Run each call in a copy of the caller's context so its TMDB
+        # requests are counted against the request that made them.
+        futures = [executor.submit(copy_context().run, call) for call in calls]
+        wait(futures, timeout=deadline)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    results = []
+    for future in futures:
+        if future.done() and not future.cancelled() and future.exception() is None:
+            results.append(future.result())
+        else:
+            if not future.done():
+                logger.info("TMDB fan-out call missed the %ss deadline", deadline)
+            results.append(None)
+    return results
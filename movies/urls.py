@@ -28,4 +28,6 @@ urlpatterns = [
     path("logout/", views.logout_view, name="logout"),
     path("suggestions/", views.suggestions, name="suggestions"),
     path("actor/<int:person_id>/<str:name>/", views.actor_search, name="actor_search"),
+    path("posters/<str:size>/<str:filename>", views.poster, name="poster"),
+    path("metrics", views.metrics, name="metrics"),
 ]
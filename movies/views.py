@@ -1,143 +1,112 @@
+import asyncio
+import math
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
-import os, requests
-from dotenv import load_dotenv
 from django.contrib.auth import login, logout
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from collections import Counter
-from .models import Favorite, Watchlist
-from difflib import SequenceMatcher
-
-load_dotenv()
-
-TMDB_BASE = "https://api.themoviedb.org/3"
-IMAGE_BASE = "https://image.tmdb.org/t/p/w500"
-
-
-def best_name_match(search_name, candidates):
-    search = search_name.lower().strip()
-    search_parts = search.split()
-    first_search = search_parts[0] if len(search_parts) > 0 else ""
-    last_search = search_parts[-1] if len(search_parts) > 1 else ""
-
-    best = None
-    best_score = 0
-
-    for cand in candidates:
-        cand_lower = cand.lower()
-        cand_parts = cand_lower.split()
-        first_cand = cand_parts[0] if len(cand_parts) > 0 else ""
-        last_cand = cand_parts[-1] if len(cand_parts) > 1 else ""
-
-        first_ratio = SequenceMatcher(None, first_search, first_cand).ratio()
-        last_ratio = (
-            SequenceMatcher(None, last_search, last_cand).ratio()
-            if last_search
-            else 0.5
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from .conditional import (
+    etag_for,
+    fingerprint,
+    is_public,
+    make_private,
+    make_public,
+    not_modified,
+)
+from .cooccurrence import cooccurrence_index
+from .genres import genre_index
+from .metrics import render as render_metrics
+from .models import Favorite, Title, Watchlist
+from .people import best_candidate, person_index
+from .posters import IMAGE_FILE, PROXY_SIZES, poster_cache
+from .recommend import get_snapshot, mark_stale
+from .results import (
+    CursorPage,
+    keyset_page,
+    load,
+    requested_offset,
+    snapshot_key,
+    store,
+)
+from .taste import apply_title, remove_title
+from .titles import TITLE_APPEND, ais_fresh, aremember, resolve
+from .tmdb import IMAGE_BASE, IMAGE_ROOT, get_async_client, get_client
+from itertools import zip_longest
+
+
+async def arender(request, template_name, context=None):
+    # Templates may touch the session and lazy user, which are sync-only.
+    return await sync_to_async(render)(request, template_name, context)
+
+
+async def render_public(request, user, template_name, context, *payloads):
+    """Render a page that logged-out visitors may get from a shared cache.
+
+    For anonymous requests the ETag comes from ``payloads`` (the upstream
+    data behind the page), so a matching ``If-None-Match`` is answered
+    with a 304 before anything is rendered. Everyone else gets a private,
+    uncacheable response.
+    """
+    if not is_public(request, user):
+        return make_private(await arender(request, template_name, context))
+
+    etag = etag_for(*payloads)
+    response = not_modified(request, etag)
+    if response is None:
+        response = await arender(request, template_name, context)
+        make_public(response, etag)
+    return response
+
+
+async def _none():
+    return None
+
+
+def with_title_metadata(queryset):
+    """Evaluate saved-title rows, preferring current metadata from Title."""
+    titles = Title.objects.filter(
+        tmdb_id=OuterRef("tmdb_id"), media_type=OuterRef("media_type")
+    )
+    rows = list(
+        queryset.annotate(
+            current_title=Subquery(titles.values("title")[:1]),
+            current_poster=Subquery(titles.values("poster_path")[:1]),
         )
-
-        total_score = (first_ratio * 0.4) + (last_ratio * 0.6)
-        if total_score > best_score:
-            best_score = total_score
-            best = cand
-
-    return best if best_score >= 0.68 else None
-
-
-def get_personalized_suggestions(user):
-    api_key = os.getenv("TMDB_API_KEY")
-    favorites = Favorite.objects.filter(user=user)
-    if not favorites:
-        return []
-
-    genre_counts = Counter()
-    keyword_counts = Counter()
-    person_counts = Counter()
-
-    for fav in favorites:
-        try:
-            details_url = f"{TMDB_BASE}/{fav.media_type}/{fav.tmdb_id}"
-            details_res = requests.get(
-                details_url,
-                params={"api_key": api_key, "append_to_response": "credits,keywords"},
-            )
-            if details_res.status_code != 200:
-                continue
-            data = details_res.json()
-
-            for g in data.get("genres", []):
-                genre_counts[g["id"]] += 1
-
-            keywords = data.get("keywords", {}).get("keywords") or data.get(
-                "keywords", []
-            )
-            for k in keywords:
-                keyword_counts[k["id"]] += 1
-
-            credits = data.get("credits", {})
-            for actor in credits.get("cast", [])[:5]:
-                person_counts[actor["id"]] += 1
-            for crew_member in credits.get("crew", []):
-                if crew_member.get("job") in ["Director", "Writer", "Creator"]:
-                    person_counts[crew_member["id"]] += 2
-        except Exception:
-            continue
-
-    top_genres = [str(gid) for gid, _ in genre_counts.most_common(3)]
-    top_keywords = [str(kid) for kid, _ in keyword_counts.most_common(5)]
-    top_people = [str(pid) for pid, _ in person_counts.most_common(3)]
-
-    suggestions = []
-    for media_type in ["movie", "tv"]:
-        try:
-            discover_url = f"{TMDB_BASE}/discover/{media_type}"
-            params = {
-                "api_key": api_key,
-                "with_genres": ",".join(top_genres),
-                "with_keywords": ",".join(top_keywords),
-                "with_people": ",".join(top_people),
-                "sort_by": "popularity.desc",
-                "vote_count.gte": 50,
-                "include_adult": "false",
-                "language": "en-US",
-                "page": 1,
-            }
-            res = requests.get(discover_url, params=params)
-            if res.status_code == 200:
-                for item in res.json().get("results", [])[:10]:
-                    poster = item.get("poster_path")
-                    if not poster:
-                        continue
-                    suggestions.append(
-                        {
-                            "id": item.get("id"),
-                            "title": item.get("title") or item.get("name"),
-                            "poster": f"{IMAGE_BASE}{poster}",
-                            "media_type": media_type,
-                        }
-                    )
-        except Exception:
-            continue
-
-    favorite_keys = {(f.media_type, f.tmdb_id) for f in favorites}
-    seen = set()
-    unique = []
-    for s in suggestions:
-        key = (s["media_type"], s["id"])
-        if key not in seen and key not in favorite_keys:
-            seen.add(key)
-            unique.append(s)
-
-    from random import shuffle
-
-    shuffle(unique)
-    return unique[:10]
-
-
-def home(request):
-    api_key = os.getenv("TMDB_API_KEY")
+    )
+    for row in rows:
+        if row.current_title:
+            row.title = row.current_title
+        if row.current_poster:
+            row.poster_url = f"{IMAGE_BASE}{row.current_poster}"
+    return rows
+
+
+async def _personalized_for(user):
+    if user.is_authenticated and await Favorite.objects.filter(user=user).aexists():
+        snapshot = await sync_to_async(get_snapshot)(user)
+        return snapshot.personalized
+    return []
+
+
+async def _saved_flags(user, item_id, media_type):
+    if not user.is_authenticated:
+        return False, False
+    lookup = {"user": user, "tmdb_id": item_id, "media_type": media_type}
+    return (
+        await Favorite.objects.filter(**lookup).aexists(),
+        await Watchlist.objects.filter(**lookup).aexists(),
+    )
+
+
+async def home(request):
+    tmdb = get_async_client()
+    user = await request.auser()
     query = request.GET.get("q")
     search_type = request.GET.get("type", "title")
     media_filter = request.GET.get("media", "all")
@@ -150,23 +119,17 @@ def home(request):
 
     next_page = None
     prev_page = None
+    next_cursor = None
+    prev_cursor = None
     RESULTS_PER_PAGE = 15
     MAX_TMDB_PAGES_TO_SCAN = 10
 
     if query and search_type == "title":
 
-        def fetch_tmdb_page(q, tmdb_page):
-            url = f"{TMDB_BASE}/search/multi"
-            params = {
-                "api_key": api_key,
-                "query": q,
-                "include_adult": "false",
-                "page": tmdb_page,
-            }
-            r = requests.get(url, params=params)
-            if r.status_code != 200:
+        async def fetch_tmdb_page(q, tmdb_page):
+            data = await tmdb.search_multi(q, page=tmdb_page)
+            if not data:
                 return [], 0
-            data = r.json()
             filtered = []
             for item in data.get("results", []):
                 if item.get("media_type") not in ["movie", "tv"]:
@@ -188,126 +151,143 @@ def home(request):
                 )
             return filtered, data.get("total_pages", 1)
 
-        start = (page - 1) * RESULTS_PER_PAGE
+        # The filtered, de-duplicated list is kept per query so later pages
+        # only fetch the TMDB pages they haven't seen yet.
+        snapshot = snapshot_key("title", query, media_filter)
+        start, _ = requested_offset(request.GET, snapshot, RESULTS_PER_PAGE)
         end = start + RESULTS_PER_PAGE
-        collected = []
-        seen = set()
-        tmdb_page = 1
-        tmdb_total_pages = 1
-
-        while (
-            len(collected) < end + 1
-            and tmdb_page <= tmdb_total_pages
-            and tmdb_page <= MAX_TMDB_PAGES_TO_SCAN
-        ):
-            page_items, tmdb_total_pages = fetch_tmdb_page(query, tmdb_page)
+        wanted = end + 1
+        state = load(snapshot) or {"items": [], "next_page": 1, "last_page": 1}
+        collected = state["items"]
+        seen = {(it["media_type"], it["id"]) for it in collected}
+        tmdb_page, last_page = state["next_page"], state["last_page"]
+
+        def collect(page_items):
             for it in page_items:
+                if media_filter in ("movie", "tv") and it["media_type"] != media_filter:
+                    continue
                 key = (it["media_type"], it["id"])
                 if key in seen:
                     continue
                 seen.add(key)
                 collected.append(it)
-                if len(collected) >= end + 1:
-                    break
-            tmdb_page += 1
-
-        if media_filter in ("movie", "tv"):
-            collected = [it for it in collected if it["media_type"] == media_filter]
 
-        results = collected[start:end] if start < len(collected) else []
-        prev_page = page - 1 if page > 1 and start > 0 else None
-        next_page = page + 1 if len(collected) > end else None
+        if tmdb_page == 1:
+            page_items, tmdb_total_pages = await fetch_tmdb_page(query, 1)
+            collect(page_items)
+            last_page = min(tmdb_total_pages, MAX_TMDB_PAGES_TO_SCAN)
+            tmdb_page = 2
+
+        while len(collected) < wanted and tmdb_page <= last_page:
+            # Size the next batch from the yield of the pages fetched so far.
+            per_page = max(len(collected) / (tmdb_page - 1), 1)
+            batch = math.ceil((wanted - len(collected)) / per_page)
+            pages = range(tmdb_page, min(tmdb_page + batch, last_page + 1))
+            for page_items, _ in await asyncio.gather(
+                *(fetch_tmdb_page(query, p) for p in pages)
+            ):
+                collect(page_items)
+            tmdb_page = pages.stop
+
+        if collected and tmdb_page != state["next_page"]:
+            store(
+                snapshot,
+                {"items": collected, "next_page": tmdb_page, "last_page": last_page},
+            )
+        if tmdb_page <= last_page:
+            get_client().search_multi(query, page=tmdb_page, prefetch=True)
+
+        page_obj = CursorPage(
+            snapshot,
+            collected,
+            start,
+            RESULTS_PER_PAGE,
+            has_more=len(collected) > end,
+        )
+        results = page_obj.object_list
+        page = page_obj.number
+        prev_cursor = page_obj.previous_cursor
+        next_cursor = page_obj.next_cursor
 
     elif query and search_type == "actor":
         search_name = query.strip()
-        r = requests.get(
-            f"{TMDB_BASE}/search/person",
-            params={
-                "api_key": api_key,
-                "query": search_name,
-                "page": 1,
-                "include_adult": "false",
-            },
-        )
-        data = r.json().get("results", []) if r.status_code == 200 else []
+        known = await sync_to_async(person_index.lookup)(search_name)
+        if known:
+            person_id, name = known
+            return redirect("actor_search", person_id=person_id, name=name)
+
+        r = await tmdb.search_person(search_name)
+        data = r.get("results", []) if r else []
 
         if not data:
             simplified = "".join(
                 ch for ch in search_name if ch.isalpha() or ch.isspace()
             ).strip()
-            second_try = requests.get(
-                f"{TMDB_BASE}/search/person",
-                params={
-                    "api_key": api_key,
-                    "query": simplified,
-                    "page": 1,
-                    "include_adult": "false",
-                },
-            )
-            if second_try.status_code == 200:
-                second_data = second_try.json().get("results", [])
-                if second_data:
-                    best = second_data[0]
-                    return redirect(
-                        "actor_search", person_id=best["id"], name=best["name"]
-                    )
+            second_try = await tmdb.search_person(simplified)
+            if second_try:
+                data = second_try.get("results", [])
 
         if data:
-            names = [p.get("name", "") for p in data if p.get("name")]
-            best = best_name_match(search_name, names)
+            best = best_candidate(search_name, data)
+            if best is not None:
+                # Only a confident match is remembered; TMDB's own top
+                # result is used this once but not learned for next time.
+                await sync_to_async(person_index.learn)(best, search_name)
+            elif data[0].get("id") and data[0].get("name"):
+                best = data[0]
             if best:
-                for p in data:
-                    if p.get("name") == best:
-                        return redirect(
-                            "actor_search", person_id=p["id"], name=p["name"]
-                        )
-            first = data[0]
-            if first.get("id") and first.get("name"):
-                return redirect(
-                    "actor_search", person_id=first["id"], name=first["name"]
-                )
+                return redirect("actor_search", person_id=best["id"], name=best["name"])
 
         messages.warning(
             request, f'No actor found for "{query}". Try checking spelling.'
         )
 
     elif query and search_type == "genre":
-        gid = None
-        try:
-            g_res = requests.get(
-                f"{TMDB_BASE}/genre/movie/list",
-                params={"api_key": api_key, "language": "en-US"},
-            )
-            if g_res.status_code == 200:
-                for g in g_res.json().get("genres", []):
-                    if g["name"].lower() == query.lower():
-                        gid = g["id"]
-                        break
-        except Exception:
-            pass
-
-        if gid:
-            d = requests.get(
-                f"{TMDB_BASE}/discover/movie",
-                params={"api_key": api_key, "with_genres": gid, "page": 1},
+        genre_ids = await sync_to_async(genre_index.lookup, thread_sensitive=False)(
+            query
+        )
+        if media_filter in ("movie", "tv"):
+            genre_ids = {mt: gid for mt, gid in genre_ids.items() if mt == media_filter}
+
+        if genre_ids:
+            media_types = list(genre_ids)
+            pages = await asyncio.gather(
+                *(
+                    tmdb.discover(mt, with_genres=genre_ids[mt], page=page)
+                    for mt in media_types
+                )
             )
-            if d.status_code == 200:
-                for i in d.json().get("results", [])[:20]:
-                    poster = i.get("poster_path")
-                    results.append(
+            per_media = []
+            for media_type, d in zip(media_types, pages):
+                if not d:
+                    continue
+                if d.get("total_pages", 1) > page:
+                    next_page = page + 1
+                per_media.append(
+                    [
                         {
                             "id": i.get("id"),
                             "title": i.get("title") or i.get("name"),
-                            "poster": f"{IMAGE_BASE}{poster}" if poster else None,
-                            "media_type": "movie",
+                            "poster": (
+                                f"{IMAGE_BASE}{i.get('poster_path')}"
+                                if i.get("poster_path")
+                                else None
+                            ),
+                            "media_type": media_type,
                             "overview": i.get("overview"),
-                            "release": i.get("release_date"),
+                            "release": i.get("release_date") or i.get("first_air_date"),
                         }
-                    )
+                        for i in d.get("results", [])[:20]
+                    ]
+                )
+            # Alternate movie and TV results so both show up on every page.
+            for group in zip_longest(*per_media):
+                results.extend(it for it in group if it)
+            prev_page = page - 1 if page > 1 else None
         else:
             messages.warning(request, f'Genre "{query}" not found.')
 
-        return render(
+        return await arender(
             request,
             "movies/home.html",
             {
@@ -318,51 +298,45 @@ def home(request):
                 "trending": [],
                 "popular_tv": [],
                 "page": page,
-                "next_page": None,
-                "prev_page": None,
+                "next_page": next_page,
+                "prev_page": prev_page,
             },
         )
 
     else:
-        params = {"api_key": api_key}
-        if media_filter in ("all", "movie"):
-            t_res = requests.get(f"{TMDB_BASE}/trending/movie/week", params=params)
-            if t_res.status_code == 200:
-                for item in t_res.json().get("results", [])[:10]:
-                    trending.append(
-                        {
-                            "id": item.get("id"),
-                            "title": item.get("title"),
-                            "poster": (
-                                f"{IMAGE_BASE}{item.get('poster_path')}"
-                                if item.get("poster_path")
-                                else None
-                            ),
-                            "media_type": "movie",
-                        }
-                    )
-        if media_filter in ("all", "tv"):
-            p_res = requests.get(f"{TMDB_BASE}/tv/popular", params=params)
-            if p_res.status_code == 200:
-                for item in p_res.json().get("results", [])[:10]:
-                    popular_tv.append(
-                        {
-                            "id": item.get("id"),
-                            "title": item.get("name"),
-                            "poster": (
-                                f"{IMAGE_BASE}{item.get('poster_path')}"
-                                if item.get("poster_path")
-                                else None
-                            ),
-                            "media_type": "tv",
-                        }
-                    )
-
-        if (
-            request.user.is_authenticated
-            and Favorite.objects.filter(user=request.user).exists()
-        ):
-            personalized_suggestions = get_personalized_suggestions(request.user)
+        t_res, p_res, personalized_suggestions = await asyncio.gather(
+            tmdb.trending_movies() if media_filter in ("all", "movie") else _none(),
+            tmdb.popular_tv() if media_filter in ("all", "tv") else _none(),
+            _personalized_for(user),
+        )
+        if t_res:
+            for item in t_res.get("results", [])[:10]:
+                trending.append(
+                    {
+                        "id": item.get("id"),
+                        "title": item.get("title"),
+                        "poster": (
+                            f"{IMAGE_BASE}{item.get('poster_path')}"
+                            if item.get("poster_path")
+                            else None
+                        ),
+                        "media_type": "movie",
+                    }
+                )
+        if p_res:
+            for item in p_res.get("results", [])[:10]:
+                popular_tv.append(
+                    {
+                        "id": item.get("id"),
+                        "title": item.get("name"),
+                        "poster": (
+                            f"{IMAGE_BASE}{item.get('poster_path')}"
+                            if item.get("poster_path")
+                            else None
+                        ),
+                        "media_type": "tv",
+                    }
+                )
 
     context = {
         "results": results,
@@ -375,19 +349,34 @@ def home(request):
         "page": page,
         "next_page": next_page,
         "prev_page": prev_page,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+        "fragment_versions": {
+            "trending": fingerprint(trending),
+            "popular_tv": fingerprint(popular_tv),
+        },
     }
-    return render(request, "movies/home.html", context)
+    if query:
+        return await arender(request, "movies/home.html", context)
+    return await render_public(
+        request, user, "movies/home.html", context, media_filter, trending, popular_tv
+    )
 
 
-def upcoming_premieres(request):
-    api_key = os.getenv("TMDB_API_KEY")
-    upcoming_movies, on_air_tv, personalized_suggestions = [], [], []
-    params = {"api_key": api_key}
+async def upcoming_premieres(request):
+    tmdb = get_async_client()
+    user = await request.auser()
+    upcoming_movies, on_air_tv = [], []
+
+    up_res, air_res, personalized_suggestions = await asyncio.gather(
+        tmdb.upcoming_movies(),
+        tmdb.on_the_air_tv(),
+        _personalized_for(user),
+    )
 
     try:
-        up_res = requests.get(f"{TMDB_BASE}/movie/upcoming", params=params)
-        if up_res.status_code == 200:
-            for item in up_res.json().get("results", [])[:15]:
+        if up_res:
+            for item in up_res.get("results", [])[:15]:
                 upcoming_movies.append(
                     {
                         "id": item.get("id"),
@@ -404,9 +393,8 @@ def upcoming_premieres(request):
         pass
 
     try:
-        air_res = requests.get(f"{TMDB_BASE}/tv/on_the_air", params=params)
-        if air_res.status_code == 200:
-            for item in air_res.json().get("results", [])[:15]:
+        if air_res:
+            for item in air_res.get("results", [])[:15]:
                 on_air_tv.append(
                     {
                         "id": item.get("id"),
@@ -422,28 +410,37 @@ def upcoming_premieres(request):
     except Exception:
         pass
 
-    if (
-        request.user.is_authenticated
-        and Favorite.objects.filter(user=request.user).exists()
-    ):
-        personalized_suggestions = get_personalized_suggestions(request.user)
-
     context = {
         "upcoming_movies": upcoming_movies,
         "on_air_tv": on_air_tv,
         "personalized_suggestions": personalized_suggestions,
+        "fragment_versions": {
+            "upcoming_movies": fingerprint(upcoming_movies),
+            "on_air_tv": fingerprint(on_air_tv),
+        },
     }
-    return render(request, "movies/upcoming.html", context)
+    return await render_public(
+        request, user, "movies/upcoming.html", context, upcoming_movies, on_air_tv
+    )
+
 
+# Everything the details page shows, fetched with one TMDB request.
+DETAILS_PARTS = TITLE_APPEND + ("similar", "videos", "watch/providers")
 
-def details(request, item_id, media_type):
-    api_key = os.getenv("TMDB_API_KEY")
-    url = f"{TMDB_BASE}/{media_type}/{item_id}"
-    params = {"api_key": api_key, "append_to_response": "credits,similar,videos"}
-    response = requests.get(url, params=params)
 
-    if response.status_code == 200:
-        data = response.json()
+async def details(request, item_id, media_type):
+    tmdb = get_async_client()
+    user = await request.auser()
+    data, (is_favorited, is_watchlisted), also_favorited, fresh = await asyncio.gather(
+        tmdb.title(media_type, item_id, parts=DETAILS_PARTS),
+        _saved_flags(user, item_id, media_type),
+        sync_to_async(cooccurrence_index.neighbors)((media_type, item_id)),
+        ais_fresh(media_type, item_id),
+    )
+
+    if data:
+        if not fresh:
+            await aremember(media_type, data)
         cast = data.get("credits", {}).get("cast", [])[:5]
         similar = data.get("similar", {}).get("results", [])[:8]
 
@@ -467,12 +464,9 @@ def details(request, item_id, media_type):
 
         watch_providers = []
         try:
-            prov_res = requests.get(
-                f"{TMDB_BASE}/{media_type}/{item_id}/watch/providers",
-                params={"api_key": api_key},
-            )
-            if prov_res.status_code == 200:
-                us = prov_res.json().get("results", {}).get("US", {})
+            prov_res = data.get("watch/providers")
+            if prov_res:
+                us = prov_res.get("results", {}).get("US", {})
                 names = []
                 for key in ("flatrate", "ads", "free"):
                     for entry in us.get(key, []) or []:
@@ -483,16 +477,6 @@ def details(request, item_id, media_type):
         except Exception:
             watch_providers = []
 
-        is_favorited = False
-        is_watchlisted = False
-        if request.user.is_authenticated:
-            is_favorited = Favorite.objects.filter(
-                user=request.user, tmdb_id=item_id, media_type=media_type
-            ).exists()
-            is_watchlisted = Watchlist.objects.filter(
-                user=request.user, tmdb_id=item_id, media_type=media_type
-            ).exists()
-
         context = {
             "item": data,
             "poster": (
@@ -503,14 +487,22 @@ def details(request, item_id, media_type):
             "media_type": media_type,
             "cast": cast,
             "similar": similar,
+            "also_favorited": also_favorited,
             "is_favorited": is_favorited,
             "is_watchlisted": is_watchlisted,
             "watch_providers": watch_providers,
             "trailer_key": trailer_key,
+            "fragment_versions": {
+                "related": fingerprint(media_type, cast, similar, also_favorited),
+            },
         }
-        return render(request, "movies/details.html", context)
+        return await render_public(
+            request, user, "movies/details.html", context, data, also_favorited
+        )
 
-    return render(request, "movies/details.html", {"error": "Details not found."})
+    return await arender(
+        request, "movies/details.html", {"error": "Details not found."}
+    )
 
 
 def signup_view(request):
@@ -551,15 +543,54 @@ def logout_view(request):
     return redirect("home")
 
 
+SAVED_PER_PAGE = 24
+SAVED_ORDERINGS = {
+    "newest": ["-added_at", "-id"],
+    "oldest": ["added_at", "id"],
+    "type": ["media_type", "-added_at", "-id"],
+}
+# Only the columns the favorites and watchlist templates use.
+SAVED_FIELDS = ("id", "tmdb_id", "title", "media_type", "poster_url", "added_at")
+
+
+def _saved_page(request, model):
+    """Return one keyset-paginated page of a user's saved titles."""
+    sort = request.GET.get("sort", "newest")
+    if sort not in SAVED_ORDERINGS:
+        sort = "newest"
+    media = request.GET.get("media", "all")
+    cursor = request.GET.get("cursor")
+
+    queryset = model.objects.filter(user=request.user).only(*SAVED_FIELDS)
+    if media in ("movie", "tv"):
+        queryset = queryset.filter(media_type=media)
+    rows, next_cursor = keyset_page(
+        queryset,
+        SAVED_ORDERINGS[sort],
+        SAVED_PER_PAGE,
+        cursor=cursor,
+        scope=snapshot_key(model.__name__, request.user.pk, sort, media),
+        evaluate=with_title_metadata,
+    )
+    context = {
+        "sort": sort,
+        "media": media,
+        "next_cursor": next_cursor,
+        "is_first_page": not cursor,
+    }
+    return rows, context
+
+
+def _favorite_keys(user):
+    return set(Favorite.objects.filter(user=user).values_list("media_type", "tmdb_id"))
+
+
 @login_required
 def add_favorite(request, item_id, media_type):
-    api_key = os.getenv("TMDB_API_KEY")
-    url = f"{TMDB_BASE}/{media_type}/{item_id}"
-    response = requests.get(url, params={"api_key": api_key})
-    if response.status_code == 200:
-        data = response.json()
-        title = data.get("title") or data.get("name")
-        poster_path = data.get("poster_path")
+    title_row = resolve(media_type, item_id)
+    if title_row:
+        title = title_row.title
+        poster_path = title_row.poster_path
         poster_url = f"{IMAGE_BASE}{poster_path}" if poster_path else None
         _, created = Favorite.objects.get_or_create(
             user=request.user,
@@ -568,6 +599,13 @@ def add_favorite(request, item_id, media_type):
             defaults={"title": title, "poster_url": poster_url},
         )
         if created:
+            apply_title(request.user, title_row)
+            cooccurrence_index.record(
+                _favorite_keys(request.user),
+                (media_type, item_id),
+                meta=(title, poster_url),
+            )
+            mark_stale(request.user)
             messages.success(request, f'"{title}" added to favorites!')
         else:
             messages.info(request, f'"{title}" is already in your favorites.')
@@ -578,8 +616,8 @@ def add_favorite(request, item_id, media_type):
 
 @login_required
 def favorites(request):
-    user_favorites = Favorite.objects.filter(user=request.user).order_by("-added_at")
-    context = {"favorites": user_favorites}
+    user_favorites, context = _saved_page(request, Favorite)
+    context["favorites"] = user_favorites
     return render(request, "movies/favorites.html", context)
 
 
@@ -589,6 +627,13 @@ def remove_favorite(request, fav_id):
     if favorite:
         title = favorite.title
         favorite.delete()
+        remove_title(request.user, favorite.media_type, favorite.tmdb_id)
+        cooccurrence_index.record(
+            _favorite_keys(request.user),
+            (favorite.media_type, favorite.tmdb_id),
+            sign=-1,
+        )
+        mark_stale(request.user)
         messages.info(request, f'"{title}" removed from favorites.')
     else:
         messages.warning(request, "Favorite not found.")
@@ -596,73 +641,32 @@ def remove_favorite(request, fav_id):
 
 
 @login_required
-def suggestions(request):
-    api_key = os.getenv("TMDB_API_KEY")
-    base = get_personalized_suggestions(request.user)
-
-    more = []
-    user_favs = Favorite.objects.filter(user=request.user).order_by("-added_at")[:6]
-    for fav in user_favs:
-        try:
-            rec_url = f"{TMDB_BASE}/{fav.media_type}/{fav.tmdb_id}/recommendations"
-            res = requests.get(rec_url, params={"api_key": api_key, "page": 1})
-            if res.status_code == 200:
-                for item in res.json().get("results", [])[:10]:
-                    poster = item.get("poster_path")
-                    if not poster:
-                        continue
-                    more.append(
-                        {
-                            "id": item.get("id"),
-                            "title": item.get("title") or item.get("name"),
-                            "poster": f"{IMAGE_BASE}{poster}",
-                            "media_type": (
-                                fav.media_type
-                                if item.get("media_type") is None
-                                else item.get("media_type")
-                            ),
-                        }
-                    )
-        except Exception:
-            continue
-
-    favorite_keys = {
-        (f.media_type, f.tmdb_id) for f in Favorite.objects.filter(user=request.user)
-    }
-    seen = {(x["media_type"], x["id"]) for x in base}
-    combined = base[:]
-    for s in more:
-        key = (s["media_type"], s["id"])
-        if key not in seen and key not in favorite_keys:
-            seen.add(key)
-            combined.append(s)
+async def suggestions(request):
+    user = await request.auser()
+    per_page = 12
+    key = snapshot_key("suggestions", user.pk)
+    offset, from_cursor = requested_offset(request.GET, key, per_page)
 
-    combined = combined[:40]
+    # Later pages reuse the list the first page was sliced from, so
+    # paging stays consistent even if the stored snapshot is refreshed.
+    combined = await sync_to_async(load)(key) if from_cursor else None
+    if combined is None:
+        snapshot = await sync_to_async(get_snapshot)(user)
+        combined = snapshot.items
+        await sync_to_async(store)(key, combined)
 
-    page = request.GET.get("page", 1)
-    per_page = 12
-    paginator = Paginator(combined, per_page)
-    try:
-        page_obj = paginator.page(page)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+    page_obj = CursorPage(key, combined, offset, per_page)
 
     context = {"suggestions": list(page_obj.object_list), "page_obj": page_obj}
-    return render(request, "movies/suggestions.html", context)
+    return await arender(request, "movies/suggestions.html", context)
 
 
-def actor_search(request, person_id, name):
-    api_key = os.getenv("TMDB_API_KEY")
+async def _actor_credits(person_id):
+    """Return a person's movie and TV credits, newest first."""
     credits = []
     try:
-        res = requests.get(
-            f"{TMDB_BASE}/person/{person_id}/combined_credits",
-            params={"api_key": api_key},
-        )
-        if res.status_code == 200:
-            data = res.json()
+        data = await get_async_client().person_combined_credits(person_id)
+        if data:
             for item in data.get("cast", []):
                 media_type = item.get("media_type")
                 if media_type not in ["movie", "tv"]:
@@ -687,35 +691,44 @@ def actor_search(request, person_id, name):
         date = x.get("release") or ""
         return (date is None, date)
 
-    credits_sorted = sorted(credits, key=sort_key, reverse=True)
+    return sorted(credits, key=sort_key, reverse=True)
 
-    page = request.GET.get("page", 1)
+
+async def actor_search(request, person_id, name):
     per_page = 15
-    paginator = Paginator(credits_sorted, per_page)
-    try:
-        page_obj = paginator.page(page)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+    key = snapshot_key("actor", person_id)
+    offset, _ = requested_offset(request.GET, key, per_page)
+
+    credits_sorted = await sync_to_async(load)(key)
+    if credits_sorted is None:
+        credits_sorted = await _actor_credits(person_id)
+        if credits_sorted:
+            await sync_to_async(store)(key, credits_sorted)
+
+    page_obj = CursorPage(key, credits_sorted, offset, per_page)
 
     context = {
         "results": list(page_obj.object_list),
         "actor_name": name,
         "page_obj": page_obj,
     }
-    return render(request, "movies/actor_search.html", context)
+    return await render_public(
+        request,
+        await request.auser(),
+        "movies/actor_search.html",
+        context,
+        name,
+        page_obj.number,
+        page_obj.object_list,
+    )
 
 
 @login_required
 def add_watchlist(request, item_id, media_type):
-    api_key = os.getenv("TMDB_API_KEY")
-    url = f"{TMDB_BASE}/{media_type}/{item_id}"
-    res = requests.get(url, params={"api_key": api_key})
-    if res.status_code == 200:
-        data = res.json()
-        title = data.get("title") or data.get("name")
-        poster_path = data.get("poster_path")
+    title_row = resolve(media_type, item_id)
+    if title_row:
+        title = title_row.title
+        poster_path = title_row.poster_path
         poster_url = f"{IMAGE_BASE}{poster_path}" if poster_path else None
         _, created = Watchlist.objects.get_or_create(
             user=request.user,
@@ -734,8 +747,9 @@ def add_watchlist(request, item_id, media_type):
 
 @login_required
 def watchlist(request):
-    items = Watchlist.objects.filter(user=request.user).order_by("-added_at")
-    return render(request, "movies/watchlist.html", {"watchlist": items})
+    items, context = _saved_page(request, Watchlist)
+    context["watchlist"] = items
+    return render(request, "movies/watchlist.html", context)
 
 
 @login_required
@@ -748,3 +762,36 @@ def remove_watchlist(request, wl_id):
     else:
         messages.warning(request, "Watchlist item not found.")
     return redirect("watchlist")
+
+
+def poster(request, size, filename):
+    """Serve a TMDB image from the local poster cache."""
+    if size not in PROXY_SIZES or not IMAGE_FILE.fullmatch(filename):
+        raise Http404("Unknown image.")
+    path = poster_cache.get(size, filename) if settings.POSTER_PROXY else None
+    if path is None:
+        return redirect(f"{IMAGE_ROOT}/{size}/{filename}")
+
+    response = FileResponse(open(path, "rb"))
+    # TMDB image paths change whenever the image does.
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+def metrics(request):
+    """Prometheus text-format metrics for this worker process.
+
+    Scrapers must send ``settings.METRICS_TOKEN`` as a bearer token. With
+    no token configured the endpoint is only open under ``DEBUG``.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -33,6 +33,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "movies.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -61,6 +62,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "screensense.wsgi.application"
+ASGI_APPLICATION = "screensense.asgi.application"
 
 
 if "ON_HEROKU" in os.environ:
@@ -106,3 +108,124 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
+# Point at a stand-in server (e.g. the benchmark's fake TMDB) when needed.
+TMDB_BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")
+
+# Per-worker connection pool and resilience settings for the TMDB client.
+TMDB_POOL_SIZE = int(os.getenv("TMDB_POOL_SIZE", 10))
+TMDB_CONNECT_TIMEOUT = float(os.getenv("TMDB_CONNECT_TIMEOUT", 3.05))
+TMDB_READ_TIMEOUT = float(os.getenv("TMDB_READ_TIMEOUT", 8))
+TMDB_MAX_RETRIES = int(os.getenv("TMDB_MAX_RETRIES", 2))
+TMDB_RETRY_BACKOFF = float(os.getenv("TMDB_RETRY_BACKOFF", 0.3))
+
+# TMDB responses are cached in their own alias. LocMemCache evicts least
+# recently used entries once MAX_ENTRIES is reached.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "tmdb": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "tmdb",
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("TMDB_CACHE_MAX_ENTRIES", 2000)),
+        },
+    },
+    # Shared poster grids rendered by {% cache %}, keyed by a fingerprint of
+    # their data, so entries never need a TTL and are only culled.
+    "template_fragments": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "template_fragments",
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("FRAGMENT_CACHE_MAX_ENTRIES", 1000)),
+        },
+    },
+}
+
+TMDB_CACHE_ALIAS = "tmdb"
+TMDB_CACHE_TTLS = {
+    "static": 60 * 60 * 24,
+    "lists": 60 * 60,
+    "details": 60 * 60 * 6,
+    "search": 60 * 15,
+}
+
+# Bounded concurrency for views that fan out into several TMDB calls.
+TMDB_FANOUT_WORKERS = int(os.getenv("TMDB_FANOUT_WORKERS", 8))
+TMDB_FANOUT_DEADLINE = float(os.getenv("TMDB_FANOUT_DEADLINE", 6))
+
+# How long each worker keeps its in-memory genre index before reloading.
+TMDB_GENRE_INDEX_TTL = int(os.getenv("TMDB_GENRE_INDEX_TTL", 60 * 60 * 24))
+
+# How long past its TTL an entry may still be served while it is refreshed
+# in the background (also used when TMDB is failing).
+TMDB_CACHE_MAX_STALE = {
+    "static": 60 * 60 * 24 * 7,
+    "lists": 60 * 60 * 12,
+    "details": 60 * 60 * 24 * 2,
+    "search": 0,
+}
+
+# Identical concurrent TMDB fetches are always coalesced within a worker.
+# Enable the shared flag when the "tmdb" cache is shared between workers
+# (e.g. Redis) to also coalesce across them, waiting up to WAIT seconds.
+TMDB_SINGLE_FLIGHT_SHARED = os.getenv("TMDB_SINGLE_FLIGHT_SHARED") == "1"
+TMDB_SINGLE_FLIGHT_WAIT = float(os.getenv("TMDB_SINGLE_FLIGHT_WAIT", 5))
+
+# Client-side TMDB rate limiting (requests/second; 0 disables a limit) and
+# circuit breaker. Calls that can't get a token within RATE_LIMIT_WAIT
+# seconds, or arrive while the circuit is open, are skipped.
+TMDB_RATE_LIMIT = float(os.getenv("TMDB_RATE_LIMIT", 20))
+TMDB_RATE_BURST = int(os.getenv("TMDB_RATE_BURST", 20))
+TMDB_GLOBAL_RATE_LIMIT = int(os.getenv("TMDB_GLOBAL_RATE_LIMIT", 0))
+TMDB_RATE_LIMIT_WAIT = float(os.getenv("TMDB_RATE_LIMIT_WAIT", 1))
+TMDB_BREAKER_FAILURES = int(os.getenv("TMDB_BREAKER_FAILURES", 5))
+TMDB_BREAKER_COOLDOWN = float(os.getenv("TMDB_BREAKER_COOLDOWN", 30))
+
+# Seconds between per-worker rebuilds of the local content-based recommender.
+RECOMMENDER_REFRESH = int(os.getenv("RECOMMENDER_REFRESH", 60 * 10))
+
+# Seconds between per-worker rebuilds of the favorites co-occurrence index.
+COOCCURRENCE_REFRESH = int(os.getenv("COOCCURRENCE_REFRESH", 60 * 10))
+
+# Actor searches for a name (or alias) an earlier search resolved are
+# answered from a local index, rebuilt per worker every PERSON_INDEX_REFRESH
+# seconds; other names are looked up on TMDB.
+PERSON_INDEX_REFRESH = int(os.getenv("PERSON_INDEX_REFRESH", 60 * 30))
+
+# Seconds a materialized result list (title search, filmography, suggestions)
+# is kept so later pages are sliced from it instead of recomputed.
+RESULT_SNAPSHOT_TTL = int(os.getenv("RESULT_SNAPSHOT_TTL", 60 * 10))
+
+# Logged-out home, upcoming, details and actor pages are sent with an ETag
+# and may be cached by browsers and shared caches (CDN, reverse proxy) for
+# ANON_PAGE_MAX_AGE seconds, then served stale for up to ANON_PAGE_STALE
+# more while they revalidate. Change ANON_PAGE_VERSION (Heroku's release
+# version by default) when templates change so old ETags stop matching.
+ANON_PAGE_MAX_AGE = int(os.getenv("ANON_PAGE_MAX_AGE", 60 * 5))
+ANON_PAGE_STALE = int(os.getenv("ANON_PAGE_STALE", 60 * 30))
+ANON_PAGE_VERSION = os.getenv(
+    "ANON_PAGE_VERSION", os.getenv("HEROKU_RELEASE_VERSION", "1")
+)
+
+# Serve TMDB images through the local /posters/ proxy, which keeps them on
+# disk (up to POSTER_CACHE_MAX_BYTES, least recently served evicted first)
+# and sends them with year-long immutable cache headers.
+POSTER_PROXY = os.getenv("POSTER_PROXY") == "1"
+POSTER_CACHE_DIR = Path(os.getenv("POSTER_CACHE_DIR", BASE_DIR / ".poster-cache"))
+POSTER_CACHE_MAX_BYTES = int(os.getenv("POSTER_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+# Per-request timing: /metrics serves Prometheus-format counters and
+# histograms for this worker to requests sending "Authorization: Bearer
+# <METRICS_TOKEN>"; without a token it is refused unless DEBUG is on.
+# SERVER_TIMING=1 adds a Server-Timing header with TMDB, database and
+# cache totals to every response.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+# Offline TMDB: "record" saves every TMDB response under TMDB_REPLAY_DIR,
+# "replay" serves only those (no network or API key needed), sleeping
+# TMDB_REPLAY_LATENCY ms per call to simulate TMDB. Empty leaves it off.
+TMDB_REPLAY_MODE = os.getenv("TMDB_REPLAY_MODE", "")
+TMDB_REPLAY_DIR = Path(os.getenv("TMDB_REPLAY_DIR", BASE_DIR / "tmdb-recordings"))
+TMDB_REPLAY_LATENCY = float(os.getenv("TMDB_REPLAY_LATENCY", 0))
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'screensense.settings')
 
 application = get_wsgi_application()
+
+# Warm the per-worker genre index without delaying start-up.
+from movies.genres import genre_index  # noqa: E402
+
+genre_index.warm()